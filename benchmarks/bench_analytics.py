@@ -0,0 +1,205 @@
+"""Micro-benchmarks for the pure analytics functions in app.py.
+
+Generates deterministic synthetic sales histories (daily, weekly, monthly and
+yearly rows mixed like real retailer data, with Decimal/datetime values as
+psycopg2 returns them) and records wall time and peak traced memory for each
+function at each size.
+
+    # record a baseline
+    python benchmarks/bench_analytics.py --sizes 100,1000,10000,100000 --save bench_analytics.json
+    # compare a later run against it (exit code 1 on regression)
+    python benchmarks/bench_analytics.py --sizes 100,1000,10000,100000 --compare bench_analytics.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import decimal
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+LEVEL_WEIGHTS = (('daily', 0.60), ('weekly', 0.25), ('monthly', 0.10), ('yearly', 0.05))
+DEMAND_LEVELS = ('Low', 'Medium', 'High')
+
+
+def _dec(value, places=2):
+    return decimal.Decimal(f"{value:.{places}f}")
+
+
+def synthetic_sales_rows(n: int, seed: int = 42):
+    """Return `n` sales rows shaped like load_data() output, reproducible for a given seed."""
+    rng = random.Random(seed)
+    levels = [lvl for lvl, _ in LEVEL_WEIGHTS]
+    weights = [w for _, w in LEVEL_WEIGHTS]
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        level = rng.choices(levels, weights)[0]
+        moment = start + timedelta(days=rng.randrange(0, 365 * 10))
+        year, month, day = moment.year, moment.month, moment.day
+        week = (day - 1) // 7 + 1
+        if level == 'daily':
+            week_date = f"{year}-{month:02d}-{day:02d}"
+            m, w, d = month, week, day
+        elif level == 'weekly':
+            week_date = f"{year}-{month:02d}-W{week:02d}"
+            m, w, d = month, week, None
+        elif level == 'monthly':
+            week_date = f"{year}-{month:02d}"
+            m, w, d = month, None, None
+        else:
+            week_date = f"{year}"
+            m, w, d = None, None, None
+        # Seasonal demand with noise; coarser levels aggregate more days
+        scale = {'daily': 1, 'weekly': 7, 'monthly': 30, 'yearly': 365}[level]
+        season = 1.0 + 0.25 * ((month in (6, 7, 12)) - (month in (2, 3)))
+        sold = max(0.0, rng.gauss(40.0, 8.0) * season * scale)
+        unsold = max(0.0, rng.gauss(4.0, 2.0) * scale)
+        price = rng.uniform(38.0, 62.0)
+        population = rng.randrange(300, 3500)
+        avg_consumption = rng.uniform(0.1, 0.4)
+        purchasing_power = rng.uniform(0.3, 1.0)
+        competitors = rng.randrange(0, 7)
+        total = sold + unsold
+        rows.append({
+            'id': f"{rng.getrandbits(128):032x}",
+            'user_id': '00000000-0000-0000-0000-000000000001',
+            'timestamp': moment + timedelta(seconds=i),
+            'week_date': week_date,
+            'data_level': level,
+            'year': year,
+            'month': m,
+            'week': w,
+            'day': d,
+            'rice_sold': _dec(sold),
+            'rice_unsold': _dec(unsold),
+            'price_per_kg': _dec(price),
+            'population': population,
+            'avg_consumption': _dec(avg_consumption, 3),
+            'purchasing_power': _dec(purchasing_power, 3),
+            'competitors': competitors,
+            'customer_demand': rng.choice(DEMAND_LEVELS),
+            'predicted_demand': _dec(population * avg_consumption * purchasing_power / (1 + competitors)),
+            'waste_percentage': _dec(unsold / total * 100 if total else 0),
+            'total_revenue': _dec(sold * price),
+        })
+    return rows
+
+
+def benchmark_cases(app):
+    """(name, callable(data)) for every function under test."""
+    return [
+        ('filter_data_by_time', lambda data: app.filter_data_by_time(data, 2020, 6, 2)),
+        ('calculate_trend_analysis', app.calculate_trend_analysis),
+        ('calculate_correlation_analysis', app.calculate_correlation_analysis),
+        ('calculate_market_comparison', app.calculate_market_comparison),
+        ('generate_ai_recommendations', lambda data: app.generate_ai_recommendations(data[0], data)),
+        ('validate_data_quality', app.validate_data_quality),
+        ('serialize_entry', lambda data: [app.serialize_entry(e) for e in data]),
+    ]
+
+
+def measure(func, data, repeat: int):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    func(data)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'min_s': min(times),
+        'mean_s': sum(times) / len(times),
+        'peak_kb': round(peak / 1024.0, 1),
+    }
+
+
+def run(sizes, repeat: int, seed: int, only=None):
+    import app
+    results = {}
+    for size in sizes:
+        data = synthetic_sales_rows(size, seed)
+        reps = repeat if size <= 100000 else 1
+        for name, func in benchmark_cases(app):
+            if only and name not in only:
+                continue
+            r = measure(func, data, reps)
+            results.setdefault(name, {})[str(size)] = r
+            print(f"{name:32} {size:>9} rows  min {r['min_s'] * 1000:10.2f} ms  "
+                  f"mean {r['mean_s'] * 1000:10.2f} ms  peak {r['peak_kb']:10.1f} KiB")
+        del data
+    return results
+
+
+def compare(results, baseline, threshold: float):
+    """Return a list of regression descriptions (time or memory above threshold)."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, r in by_size.items():
+            base = baseline.get('results', {}).get(name, {}).get(size)
+            if not base:
+                continue
+            for key in ('min_s', 'peak_kb'):
+                if base[key] and r[key] > base[key] * (1.0 + threshold):
+                    change = (r[key] / base[key] - 1.0) * 100.0
+                    regressions.append(f"{name} @ {size} rows: {key} {base[key]:.6g} -> {r[key]:.6g} (+{change:.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analytics functions in app.py')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated row counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (1 above 100k rows)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', help='Comma-separated function names to run')
+    parser.add_argument('--save', help='Write results as a JSON baseline to this path')
+    parser.add_argument('--compare', help='Compare against a baseline JSON and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Allowed slowdown / memory growth before flagging (default: 0.15 = 15%%)')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    only = {s.strip() for s in args.only.split(',')} if args.only else None
+    results = run(sizes, args.repeat, args.seed, only)
+
+    if args.save:
+        payload = {
+            'meta': {
+                'created_at': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }
+        Path(args.save).write_text(json.dumps(payload, indent=2), encoding='utf-8')
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""CPU cost vs bytes saved for the response compression in app.py.
+
+Builds JSON bodies shaped like the three large API responses (/api/sales,
+/api/inventory?latest=0 and /api/analytics with daily chart_data) from
+deterministic synthetic rows, serializes them exactly like jsonify(), and runs
+them through the same compress_bytes() the after_request hook uses at each
+encoding/level. The "link" column adds the transfer time of the compressed
+body at --link-mbps, so the table shows where extra CPU stops paying off.
+
+    python benchmarks/bench_compression.py --rows 1000,10000 --link-mbps 2
+    python benchmarks/bench_compression.py --levels gzip=1,6,9 br=1,4,6,11 zstd=1,3,9 --json out.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import decimal
+import argparse
+import statistics
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+DEFAULT_LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 6, 9], 'zstd': [1, 3, 9]}
+VARIETIES = ('Regular Milled', 'Well Milled', 'Sinandomeng', 'Dinorado', 'Jasmine', 'Premium', 'Malagkit')
+AREAS = ('Baclaran', 'Malibay', 'San Isidro', 'Tramo', 'Libertad', 'Villamor')
+
+
+def sales_payload(app, rows):
+    return [app.serialize_entry(r) for r in rows]
+
+
+def inventory_payload(app, n: int, seed: int):
+    """Rows shaped like BROWSE_SELECT_SQL output for latest=0."""
+    rng = random.Random(seed)
+    retailers = [(f"{rng.getrandbits(128):032x}", f"Rice Store {i}", rng.choice(AREAS)) for i in range(max(1, n // 20))]
+    start = date(2025, 1, 1)
+    rows = []
+    for i in range(n):
+        rid, company, area = retailers[i % len(retailers)]
+        posted = start + timedelta(days=i // len(retailers) % 365)
+        rows.append(app.serialize_entry({
+            'id': f"{rng.getrandbits(128):032x}",
+            'retailer_id': rid,
+            'date_posted': posted,
+            'rice_variety': rng.choice(VARIETIES),
+            'stock_kg': decimal.Decimal(f"{rng.uniform(5, 500):.2f}"),
+            'price_per_kg': decimal.Decimal(f"{rng.uniform(38, 70):.2f}"),
+            'created_at': datetime(posted.year, posted.month, posted.day, 8, tzinfo=timezone.utc) + timedelta(seconds=i),
+            'retailer_company': company,
+            'retailer_area': area,
+            'retailer_location': f"{rng.randrange(1, 999)} {area} St., Pasay City",
+        }))
+    return rows
+
+
+def analytics_payload(rows):
+    """Daily chart_data as /api/analytics returns it without a period hint."""
+    buckets = {}
+    for e in rows:
+        b = buckets.setdefault(e['week_date'], [0.0, 0.0, 0.0, 0.0, 0])
+        b[0] += float(e['rice_sold'])
+        b[1] += float(e['rice_unsold'])
+        b[2] += float(e['total_revenue'])
+        b[3] += float(e['price_per_kg'])
+        b[4] += 1
+    chart = []
+    for label, (sold, unsold, revenue, price_sum, count) in sorted(buckets.items()):
+        total = sold + unsold
+        chart.append({'week': label, 'sold': round(sold, 2), 'unsold': round(unsold, 2), 'revenue': round(revenue, 2),
+                      'price': round(price_sum / count, 2), 'waste_percentage': round(unsold / total * 100 if total else 0, 2)})
+    return {'total_entries': len(rows), 'efficiency_score': 'Good', 'chart_data': chart}
+
+
+def parse_levels(specs):
+    if not specs:
+        return DEFAULT_LEVELS
+    levels = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        levels[name.strip()] = [int(v) for v in values.split(',') if v.strip()]
+    return levels
+
+
+def measure(app, body: bytes, encoding: str, level: int, repeat: int):
+    times = []
+    out = b''
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = app.compress_bytes(body, encoding, level)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), len(out)
+
+
+def run(row_counts, levels, repeat: int, seed: int, link_mbps: float):
+    os.environ.setdefault('DB_POOL_WARM', 'false')
+    os.environ.setdefault('SUPABASE_DB_URL', '')
+    import app
+    from bench_analytics import synthetic_sales_rows
+
+    available = {'gzip'} | ({'br'} if app.brotli else set()) | ({'zstd'} if app.zstandard else set())
+    results = []
+    print(f"{'payload':22} {'encoding':10} {'KB':>9} {'ratio':>7} {'cpu ms':>8} {'MB/s':>8} {'link ms':>9} {'total ms':>9}")
+    for n in row_counts:
+        rows = synthetic_sales_rows(n, seed)
+        with app.app.app_context():
+            payloads = {
+                f"sales[{n}]": app.app.json.dumps(sales_payload(app, rows)),
+                f"inventory[{n}]": app.app.json.dumps(inventory_payload(app, n, seed)),
+                f"analytics[{n}]": app.app.json.dumps(analytics_payload(rows)),
+            }
+        for name, text in payloads.items():
+            body = (text + '\n').encode('utf-8')
+            link_ms = len(body) * 8 / (link_mbps * 1e6) * 1000
+            print(f"{name:22} {'identity':10} {len(body) / 1024:9.1f} {1.0:7.2f} {0.0:8.2f} {'':>8} {link_ms:9.1f} {link_ms:9.1f}")
+            for encoding, lvls in levels.items():
+                if encoding not in available:
+                    print(f"{name:22} {encoding:10} (not installed)")
+                    continue
+                for level in lvls:
+                    seconds, size = measure(app, body, encoding, level, repeat)
+                    link_ms = size * 8 / (link_mbps * 1e6) * 1000
+                    label = f"{encoding}-{level}"
+                    print(f"{name:22} {label:10} {size / 1024:9.1f} {len(body) / size:7.2f} {seconds * 1000:8.2f} "
+                          f"{len(body) / seconds / 1e6:8.1f} {link_ms:9.1f} {seconds * 1000 + link_ms:9.1f}")
+                    results.append({'payload': name, 'encoding': encoding, 'level': level, 'bytes_in': len(body),
+                                    'bytes_out': size, 'cpu_ms': seconds * 1000, 'link_ms': link_ms})
+        print()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare response compression CPU cost against bytes saved')
+    parser.add_argument('--rows', default='1000,10000', help='Comma-separated row counts per payload')
+    parser.add_argument('--levels', nargs='*', help='encoding=level,level ... (default: gzip=1,6,9 br=1,4,6,9 zstd=1,3,9)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--link-mbps', dest='link_mbps', type=float, default=2.0,
+                        help='Link speed used for the transfer-time column (default: 2 Mbps cellular)')
+    parser.add_argument('--json', help='Write the raw results to this path')
+    args = parser.parse_args()
+
+    results = run([int(x) for x in args.rows.split(',') if x.strip()], parse_levels(args.levels),
+                  args.repeat, args.seed, args.link_mbps)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
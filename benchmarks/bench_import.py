@@ -0,0 +1,166 @@
+"""Cold-start benchmark: `import app` time and the first rendered request.
+
+Each run is a fresh interpreter, like a worker starting after a free-tier
+spin-down. Reports
+
+  - total `import app` time and the heaviest modules it imports, parsed from
+    `python -X importtime`;
+  - the first GET /login in a new process with an empty Jinja bytecode
+    cache, and again with the cache filled by the previous process.
+
+    python benchmarks/bench_import.py --repeat 5 --save bench_import.json
+    python benchmarks/bench_import.py --repeat 5 --compare bench_import.json
+"""
+import os
+import sys
+import json
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FIRST_REQUEST_SCRIPT = """
+import time, json
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+resp = client.get('/login')
+t2 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'first_login_ms': (t2 - t1) * 1000, 'status': resp.status_code}))
+"""
+
+
+def _env(jinja_dir):
+    env = dict(os.environ)
+    # No DB or background threads: measure the code path, not the network
+    env.update({'DB_POOL_WARM': 'false', 'SUPABASE_DB_URL': '', 'JINJA_CACHE_DIR': jinja_dir,
+                'SECRET_FLASK_KEY': 'bench', 'PYTHONDONTWRITEBYTECODE': '0'})
+    return env
+
+
+def parse_importtime(stderr: str, root: str = 'app'):
+    """(total_us, {module: cumulative_us}) for the direct imports of `root`."""
+    total = 0
+    children = {}
+    stack = []
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _self_us, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, int(cumulative), name.strip()))
+    # -X importtime prints children before their parent; walk backwards to attribute them
+    for depth, cumulative, name in reversed(rows):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        if depth == 0 and name == root:
+            total = cumulative
+        elif parent == root:
+            children[name] = children.get(name, 0) + cumulative
+        stack.append((depth, name))
+    return total, children
+
+
+def measure_import(repeat: int, jinja_dir: str):
+    totals, modules = [], {}
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                              env=_env(jinja_dir), capture_output=True, text=True, check=True)
+        total, children = parse_importtime(proc.stderr)
+        totals.append(total / 1000.0)
+        for name, us in children.items():
+            modules.setdefault(name, []).append(us / 1000.0)
+    return statistics.median(totals), {k: statistics.median(v) for k, v in modules.items()}
+
+
+def measure_first_request(repeat: int, jinja_dir: str, cold_cache: bool):
+    imports, firsts = [], []
+    for _ in range(repeat):
+        if cold_cache:
+            shutil.rmtree(jinja_dir, ignore_errors=True)
+        proc = subprocess.run([sys.executable, '-c', FIRST_REQUEST_SCRIPT], cwd=ROOT, env=_env(jinja_dir),
+                              capture_output=True, text=True, check=True)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        imports.append(result['import_ms'])
+        firsts.append(result['first_login_ms'])
+    return statistics.median(imports), statistics.median(firsts)
+
+
+def run(repeat: int, top: int):
+    jinja_dir = tempfile.mkdtemp(prefix='bench-jinja-')
+    try:
+        import_ms, modules = measure_import(repeat, jinja_dir)
+        _imp, cold_ms = measure_first_request(repeat, jinja_dir, cold_cache=True)
+        _imp, warm_ms = measure_first_request(repeat, jinja_dir, cold_cache=False)
+    finally:
+        shutil.rmtree(jinja_dir, ignore_errors=True)
+    heaviest = dict(sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:top])
+    print(f"import app (-X importtime)         {import_ms:9.1f} ms")
+    print(f"first GET /login, cold Jinja cache {cold_ms:9.1f} ms")
+    print(f"first GET /login, warm Jinja cache {warm_ms:9.1f} ms")
+    print(f"\nHeaviest imports from app.py (cumulative, median of {repeat}):")
+    for name, ms in heaviest.items():
+        print(f"  {name:36} {ms:9.1f} ms")
+    return {
+        'import_ms': import_ms,
+        'first_login_cold_cache_ms': cold_ms,
+        'first_login_warm_cache_ms': warm_ms,
+        'modules_ms': heaviest,
+    }
+
+
+def compare(results, baseline, threshold: float):
+    regressions = []
+    for key in ('import_ms', 'first_login_cold_cache_ms', 'first_login_warm_cache_ms'):
+        base = baseline.get('results', {}).get(key)
+        if base and results[key] > base * (1.0 + threshold):
+            regressions.append(f"{key}: {base:.1f} -> {results[key]:.1f} ms (+{(results[key] / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start import time and first request latency')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per measurement (median)')
+    parser.add_argument('--top', type=int, default=15, help='How many of the heaviest imports to list')
+    parser.add_argument('--save', help='Write results as a JSON baseline to this path')
+    parser.add_argument('--compare', help='Compare against a baseline JSON and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Allowed slowdown before flagging (default: 0.20 = 20%%)')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.top)
+
+    if args.save:
+        payload = {
+            'meta': {
+                'created_at': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }
+        Path(args.save).write_text(json.dumps(payload, indent=2), encoding='utf-8')
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text(encoding='utf-8')), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
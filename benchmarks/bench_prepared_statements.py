@@ -0,0 +1,121 @@
+"""Compare plain vs server-side prepared execution of the hot read statements.
+
+Runs every statement registered in app.PREPARED_SQL that we can find sample
+parameters for, N times each way, and reports mean latency plus the planner
+time reported by EXPLAIN (ANALYZE) for a plain statement vs EXECUTE.
+
+    python benchmarks/bench_prepared_statements.py --db-url postgresql://... -n 500
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+import psycopg2
+
+PLANNING_RE = re.compile(r"Planning Time: ([0-9.]+) ms")
+
+
+def sample_cases(cur, app):
+    """Build (label, statement_name, params) cases from whatever data the database holds."""
+    cur.execute("SELECT user_id FROM sales GROUP BY user_id ORDER BY count(*) DESC LIMIT 1")
+    row = cur.fetchone()
+    user_id = row[0] if row else None
+    cur.execute("SELECT email FROM profiles WHERE email IS NOT NULL LIMIT 1")
+    row = cur.fetchone()
+    email = row[0] if row else 'nobody@example.com'
+    cur.execute("SELECT retailer_id, max(date_posted) FROM retailer_inventory GROUP BY retailer_id ORDER BY count(*) DESC LIMIT 1")
+    row = cur.fetchone()
+    retailer_id, last_date = (row[0], row[1]) if row else (None, None)
+
+    cases = [('login lookup', app.STMT_LOGIN_PROFILE, (email,))]
+    if user_id:
+        cases.append(('load_data', app.STMT_LOAD_SALES, (user_id,)))
+    if retailer_id:
+        name, params = app.inventory_list_statement(retailer_id)
+        cases.append(('inventory list', name, params))
+    name, params = app.inventory_browse_statement(latest=True, date_exact=last_date, variety='rice', min_price=10.0)
+    cases.append(('consumer browse (latest)', name, params))
+    return cases
+
+
+def planning_ms(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, SUMMARY) " + sql, params)
+    text = "\n".join(r[0] for r in cur.fetchall())
+    m = PLANNING_RE.search(text)
+    return float(m.group(1)) if m else 0.0
+
+
+def run_case(cur, app, name, params, iterations):
+    sql = app.PREPARED_SQL[name]
+    params = tuple(params)
+
+    plain = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        plain.append((time.perf_counter() - t0) * 1000.0)
+    plain_plan = statistics.mean(planning_ms(cur, sql, params) for _ in range(5))
+
+    cur.execute(f"PREPARE bench_{name} AS {app._to_positional(sql)}")
+    execute_sql = f"EXECUTE bench_{name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE bench_{name}"
+    prepared = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        cur.execute(execute_sql, params)
+        cur.fetchall()
+        prepared.append((time.perf_counter() - t0) * 1000.0)
+    prepared_plan = statistics.mean(planning_ms(cur, execute_sql, params) for _ in range(5))
+    cur.execute(f"DEALLOCATE bench_{name}")
+
+    return {
+        'plain_mean_ms': statistics.mean(plain),
+        'prepared_mean_ms': statistics.mean(prepared),
+        'plain_planning_ms': plain_plan,
+        'prepared_planning_ms': prepared_plan,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prepared vs plain execution of hot statements')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--json', dest='json_out', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / '.env')
+    db_url = (args.db_url or os.getenv('SUPABASE_DB_URL') or '').strip()
+    if not db_url:
+        print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+        sys.exit(1)
+
+    import app
+
+    conn = psycopg2.connect(db_url)
+    conn.autocommit = True
+    cur = conn.cursor()
+    results = {}
+    print(f"{'statement':28} {'plain ms':>10} {'prepared ms':>12} {'plan ms':>9} {'plan ms (prep)':>15}")
+    for label, name, params in sample_cases(cur, app):
+        r = run_case(cur, app, name, params, args.iterations)
+        results[label] = r
+        print(f"{label:28} {r['plain_mean_ms']:10.3f} {r['prepared_mean_ms']:12.3f} "
+              f"{r['plain_planning_ms']:9.3f} {r['prepared_planning_ms']:15.3f}")
+    conn.close()
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Wrote {args.json_out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Price-history queries: live table + Arrow archive vs one full Postgres table.
+
+Builds a temporary, unpartitioned copy of the whole history (the live
+retailer_inventory rows plus every row in the archive files), indexed on
+(rice_variety, date_posted). Then it times the same per-day price query
+three ways:
+
+  full table   one GROUP BY over the temporary copy
+  unified      the live statement from app.py plus ArchiveReader, merged as
+               /api/price-history does
+  archive      ArchiveReader alone, on the files as written and on a zstd copy
+
+for an archive-only range, a range spanning archive and live months, and a
+recent live-only range.
+
+    python inventory_archive.py --export        # needs archive files first
+    python benchmarks/bench_price_history.py --db-url postgresql://... -n 50
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+import inventory_archive
+
+FULL_SQL = (
+    "SELECT date_posted AS date, avg(price_per_kg)::float8, min(price_per_kg)::float8, max(price_per_kg)::float8, "
+    "count(price_per_kg), count(*), sum(stock_kg)::float8 FROM bench_full_inventory "
+    "WHERE rice_variety = %s AND date_posted >= %s AND date_posted <= %s GROUP BY date_posted ORDER BY date_posted"
+)
+
+
+def timed(fn, iterations):
+    samples = []
+    result = None
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.mean(samples), statistics.median(samples), result
+
+
+def load_full_copy(cur, reader):
+    """Temporary table with live rows plus every archived row."""
+    cur.execute(
+        "CREATE TEMP TABLE bench_full_inventory AS "
+        "SELECT id, retailer_id, date_posted, rice_variety, stock_kg, price_per_kg, created_at FROM retailer_inventory"
+    )
+    for _month, path in reader.files():
+        table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+        buf = io.BytesIO()
+        pa_csv.write_csv(table, buf)
+        buf.seek(0)
+        cur.copy_expert("COPY bench_full_inventory FROM STDIN WITH (FORMAT csv, HEADER true)", buf)
+    cur.execute("CREATE INDEX ON bench_full_inventory (rice_variety, date_posted)")
+    cur.execute("ANALYZE bench_full_inventory")
+    cur.execute("SELECT count(*) FROM bench_full_inventory")
+    return cur.fetchone()[0]
+
+
+def zstd_copy(reader, directory):
+    for _month, path in reader.files():
+        table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all().replace_schema_metadata(None)
+        inventory_archive.write_month(Path(directory) / path.name, table, 'zstd')
+    return inventory_archive.ArchiveReader(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark price history: archive + live vs a full table')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('--archive-dir', default=str(inventory_archive.ARCHIVE_DIR))
+    parser.add_argument('--variety', help='Variety to query (default: the most listed one)')
+    parser.add_argument('-n', '--iterations', type=int, default=30)
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / '.env')
+    db_url = (args.db_url or os.getenv('SUPABASE_DB_URL') or '').strip().strip('"').strip("'")
+    if not db_url:
+        print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+        sys.exit(1)
+    reader = inventory_archive.ArchiveReader(args.archive_dir)
+    files = reader.files()
+    if not files:
+        print(f"ERROR: no archive files in {args.archive_dir}; run inventory_archive.py --export first")
+        sys.exit(1)
+
+    import app
+
+    conn = psycopg2.connect(db_url)
+    cur = conn.cursor()
+    variety = args.variety
+    if not variety:
+        cur.execute("SELECT rice_variety FROM retailer_inventory GROUP BY 1 ORDER BY count(*) DESC LIMIT 1")
+        variety = cur.fetchone()[0]
+    cur.execute("SELECT count(*), min(date_posted) FROM retailer_inventory")
+    live_rows, live_start = cur.fetchone()
+    archive_rows = sum(int(reader._reader(p)[0].schema.metadata[inventory_archive.META_ROWS]) for _m, p in files)
+    full_rows = load_full_copy(cur, reader)
+    archive_bytes = sum(p.stat().st_size for _m, p in files)
+    zstd_dir = tempfile.mkdtemp(prefix='bench-archive-')
+    zstd_reader = zstd_copy(reader, zstd_dir)
+    zstd_bytes = sum(p.stat().st_size for _m, p in zstd_reader.files())
+    print(f"live rows {live_rows:,} (from {live_start}), archive rows {archive_rows:,} in {len(files)} file(s), "
+          f"full copy {full_rows:,} rows")
+    print(f"archive size: {archive_bytes / 1024 / 1024:.1f} MB uncompressed, {zstd_bytes / 1024 / 1024:.1f} MB zstd")
+    print(f"variety: {variety}, {args.iterations} iterations\n")
+
+    first_month = files[0][0]
+    ranges = [
+        ('archive only', first_month, min(first_month + timedelta(days=90), live_start - timedelta(days=1))),
+        ('archive + live', first_month, date.today()),
+        ('live, last 90 days', date.today() - timedelta(days=90), date.today()),
+    ]
+
+    def unified(date_from, date_to):
+        stmt, params = app.price_history_statement(variety, date_from, date_to)
+        cur.execute(app.PREPARED_SQL[stmt], params)
+        columns = [d[0] for d in cur.description]
+        live = [dict(zip(columns, r)) for r in cur.fetchall()]
+        return app.merge_daily_prices(reader.daily_prices(variety, date_from, date_to), live)
+
+    print(f"{'range':20} {'method':18} {'mean ms':>9} {'p50 ms':>9} {'days':>6}")
+    for label, date_from, date_to in ranges:
+        cases = [
+            ('full table', lambda: cur.execute(FULL_SQL, (variety, date_from, date_to)) or cur.fetchall()),
+            ('unified', lambda: unified(date_from, date_to)),
+            ('archive', lambda: reader.daily_prices(variety, date_from, date_to)),
+            ('archive (zstd)', lambda: zstd_reader.daily_prices(variety, date_from, date_to)),
+        ]
+        for method, fn in cases:
+            mean, p50, result = timed(fn, args.iterations)
+            print(f"{label:20} {method:18} {mean:9.2f} {p50:9.2f} {len(result):6}")
+        print()
+    conn.rollback()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
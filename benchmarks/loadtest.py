@@ -0,0 +1,449 @@
+"""End-to-end load test against a locally running app.
+
+Virtual users log in as the accounts created by seed_synthetic.py and replay
+the page mixes the frontend produces:
+
+  analytics  /analytics + available-years, then the six-call fan-out
+             (data-quality, trends, correlations, market-comparison,
+             analytics, sales) issued concurrently like Promise.all
+  dashboard  /dashboard, then analytics + sales and the three chart calls
+  entry      /input, progress + defaults, a daily sales entry and a burst
+             of inventory price postings
+  browse     /consumer, filtered /api/inventory, then a company page
+
+Reports throughput, p50/p95/p99 latency per endpoint and error rate, and
+samples /metrics during the run for DB pool saturation over time.
+
+    # against an app that is already running
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:5000 --users 40 --duration 60
+
+    # start gunicorn for every combination and print a comparison table
+    python benchmarks/loadtest.py --db-url postgresql://postgres@localhost:5432/anilytics \\
+        --sweep-workers 1,2 --sweep-threads 8,16 --sweep-pool 8,16 --users 60 --duration 45
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import itertools
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+import http.cookiejar
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SEED_EMAIL_DOMAIN = 'seed.anilytics.local'
+DEFAULT_MIX = 'analytics=3,dashboard=3,entry=1,browse=6'
+VARIETIES = ['Regular Milled', 'Well Milled', 'Sinandomeng', 'Dinorado', 'Jasmine', 'Premium']
+AREAS = ['Aurora Blvd', 'Cartimar', 'FB Harrison', 'Libertad', 'Taft', 'EDSA']
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Thread-safe store of (elapsed, endpoint, seconds, ok) samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+        self.started = time.perf_counter()
+
+    def add(self, endpoint, seconds, ok):
+        with self.lock:
+            self.samples.append((time.perf_counter() - self.started, endpoint, seconds, ok))
+
+
+class VirtualUser:
+    """One logged-in browser session with its own cookie jar."""
+
+    def __init__(self, base_url, email, password, recorder, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+        # Browsers open at most six connections per host
+        self.fanout = ThreadPoolExecutor(max_workers=6)
+
+    def request(self, endpoint, path, method='GET', form=None, body=None):
+        headers = {'Accept': 'application/json'}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        t0 = time.perf_counter()
+        status, payload = 0, b''
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                status, payload = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except Exception:
+            status = 0
+        self.recorder.add(endpoint, time.perf_counter() - t0, 200 <= status < 400)
+        return status, payload
+
+    def json(self, endpoint, path):
+        status, payload = self.request(endpoint, path)
+        try:
+            return json.loads(payload) if status == 200 else None
+        except ValueError:
+            return None
+
+    def login(self):
+        status, _ = self.request('POST /login', '/login', 'POST', form={'email': self.email, 'password': self.password})
+        return status == 302
+
+    def close(self):
+        self.fanout.shutdown(wait=False)
+
+
+def scenario_analytics(vu, rng):
+    vu.request('GET /analytics', '/analytics')
+    years = vu.json('GET /api/available-years', '/api/available-years') or {}
+    year_list = years.get('years') if isinstance(years, dict) else None
+    qs = ''
+    if year_list and rng.random() < 0.7:
+        qs = f"?year={rng.choice(year_list)}"
+        if rng.random() < 0.5:
+            qs += f"&month={rng.randint(1, 12)}"
+    calls = [
+        ('GET /api/data-quality', '/api/data-quality'),
+        ('GET /api/trends', '/api/trends'),
+        ('GET /api/correlations', '/api/correlations'),
+        ('GET /api/market-comparison', '/api/market-comparison'),
+        ('GET /api/analytics', '/api/analytics'),
+        ('GET /api/sales', '/api/sales'),
+    ]
+    futures = [vu.fanout.submit(vu.request, name, path + qs) for name, path in calls]
+    for f in futures:
+        f.result()
+
+
+def scenario_dashboard(vu, rng):
+    vu.request('GET /dashboard', '/dashboard')
+    first = [vu.fanout.submit(vu.request, 'GET /api/analytics', '/api/analytics'),
+             vu.fanout.submit(vu.request, 'GET /api/sales', '/api/sales')]
+    for f in first:
+        f.result()
+    second = [vu.fanout.submit(vu.request, name, path) for name, path in (
+        ('GET /api/trends', '/api/trends'),
+        ('GET /api/correlations', '/api/correlations'),
+        ('GET /api/market-comparison', '/api/market-comparison'),
+    )]
+    for f in second:
+        f.result()
+
+
+def scenario_entry(vu, rng):
+    today = date.today()
+    vu.request('GET /input', '/input')
+    vu.request('GET /api/progress', f"/api/progress?year={today.year}")
+    vu.request('GET /api/defaults', f"/api/defaults?year={today.year}&month={today.month}")
+    day = rng.randint(1, today.day)
+    vu.request('POST /data_input', '/data_input', 'POST', form={
+        'year': today.year, 'month': today.month, 'week': (day - 1) // 7 + 1, 'day': day,
+        'rice_sold': round(rng.uniform(20, 200), 2), 'rice_unsold': round(rng.uniform(0, 20), 2),
+        'price_per_kg': round(rng.uniform(40, 60), 2), 'population': rng.randint(400, 3000),
+        'avg_consumption': 0.25, 'purchasing_power': 0.6, 'competitors': rng.randint(0, 5),
+        'customer_demand': rng.choice(['Low', 'Medium', 'High']),
+    })
+    for variety in rng.sample(VARIETIES, rng.randint(2, 5)):
+        vu.request('POST /api/retailer/inventory', '/api/retailer/inventory', 'POST', body={
+            'rice_variety': variety, 'stock_kg': round(rng.uniform(20, 400), 1),
+            'price_per_kg': round(rng.uniform(40, 70) * 2) / 2,
+        })
+    vu.request('GET /api/retailer/inventory', '/api/retailer/inventory')
+
+
+def scenario_browse(vu, rng):
+    vu.request('GET /consumer', '/consumer')
+    params = {'latest': 1}
+    if rng.random() < 0.5:
+        params['variety'] = rng.choice(VARIETIES)
+    if rng.random() < 0.3:
+        params['area'] = rng.choice(AREAS)
+    if rng.random() < 0.2:
+        params['min_price'], params['max_price'] = 40, rng.choice([50, 55, 60])
+    if rng.random() < 0.15:
+        params = {'latest': 0, 'date': date.today().isoformat()}
+    rows = vu.json('GET /api/inventory', '/api/inventory?' + urllib.parse.urlencode(params)) or []
+    if isinstance(rows, list) and rows:
+        retailer_id = rng.choice(rows).get('retailer_id')
+        if retailer_id:
+            vu.request('GET /company/<id>', f"/company/{retailer_id}")
+            vu.request('GET /api/company/<id>', f"/api/company/{retailer_id}")
+            vu.request('GET /api/inventory?retailer_id', f"/api/inventory?retailer_id={retailer_id}&latest=1")
+
+
+RETAILER_SCENARIOS = {'analytics': scenario_analytics, 'dashboard': scenario_dashboard, 'entry': scenario_entry}
+CONSUMER_SCENARIOS = {'browse': scenario_browse}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in RETAILER_SCENARIOS and name not in CONSUMER_SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def run_user(index, args, mix, recorder, stop_at):
+    rng = random.Random(f"{args.seed}:{index}")
+    retailer_weight = sum(w for n, w in mix.items() if n in RETAILER_SCENARIOS)
+    consumer_weight = sum(w for n, w in mix.items() if n in CONSUMER_SCENARIOS)
+    is_retailer = rng.random() < retailer_weight / max(retailer_weight + consumer_weight, 1e-9)
+    if is_retailer:
+        email = f"retailer{rng.randrange(args.seeded_retailers):05d}@{SEED_EMAIL_DOMAIN}"
+        scenarios = {n: w for n, w in mix.items() if n in RETAILER_SCENARIOS}
+        table = RETAILER_SCENARIOS
+    else:
+        email = f"consumer{rng.randrange(args.seeded_consumers):05d}@{SEED_EMAIL_DOMAIN}"
+        scenarios = {n: w for n, w in mix.items() if n in CONSUMER_SCENARIOS}
+        table = CONSUMER_SCENARIOS
+    vu = VirtualUser(args.base_url, email, args.password, recorder, args.timeout)
+    try:
+        if not vu.login():
+            return
+        names, weights = list(scenarios), list(scenarios.values())
+        while time.perf_counter() < stop_at:
+            table[rng.choices(names, weights)[0]](vu, rng)
+            time.sleep(rng.expovariate(1.0 / args.think) if args.think > 0 else 0)
+    finally:
+        vu.close()
+
+
+def scrape_pool(base_url, token, timeout=5.0):
+    """Return {'in_use', 'idle', 'wait_sum', 'wait_count'} summed over pools, or None."""
+    req = urllib.request.Request(base_url.rstrip('/') + '/metrics')
+    if token:
+        req.add_header('Authorization', f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            text = resp.read().decode()
+    except Exception:
+        return None
+    out = {'in_use': 0.0, 'idle': 0.0, 'wait_sum': 0.0, 'wait_count': 0.0}
+    for line in text.splitlines():
+        if line.startswith('anilytics_db_pool_connections{'):
+            value = float(line.rsplit(' ', 1)[1])
+            if 'state="in_use"' in line:
+                out['in_use'] += value
+            elif 'state="idle"' in line:
+                out['idle'] += value
+        elif line.startswith('anilytics_db_pool_checkout_wait_seconds_sum'):
+            out['wait_sum'] += float(line.rsplit(' ', 1)[1])
+        elif line.startswith('anilytics_db_pool_checkout_wait_seconds_count'):
+            out['wait_count'] += float(line.rsplit(' ', 1)[1])
+    return out
+
+
+def sample_pool(args, recorder, stop_event, timeline):
+    prev = None
+    while not stop_event.wait(args.sample_interval):
+        snap = scrape_pool(args.base_url, args.metrics_token)
+        if snap is None:
+            continue
+        point = {'t': round(time.perf_counter() - recorder.started, 1), 'in_use': snap['in_use'],
+                 'idle': snap['idle'], 'wait_ms': None}
+        if prev is not None:
+            checkouts = snap['wait_count'] - prev['wait_count']
+            if checkouts > 0:
+                point['wait_ms'] = round((snap['wait_sum'] - prev['wait_sum']) / checkouts * 1000, 2)
+        prev = snap
+        timeline.append(point)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples, duration):
+    by_endpoint = {}
+    for _t, endpoint, seconds, ok in samples:
+        by_endpoint.setdefault(endpoint, []).append((seconds, ok))
+    by_endpoint['ALL'] = [(s, ok) for _t, _e, s, ok in samples]
+    summary = {}
+    for endpoint, values in by_endpoint.items():
+        latencies = sorted(s for s, _ok in values)
+        errors = sum(1 for _s, ok in values if not ok)
+        summary[endpoint] = {
+            'count': len(values),
+            'rps': round(len(values) / duration, 2) if duration else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'error_rate': round(errors / len(values), 4) if values else 0.0,
+        }
+    return summary
+
+
+def run_load(args):
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    stop_at = time.perf_counter() + args.duration
+    timeline = []
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_pool, args=(args, recorder, stop_event, timeline), daemon=True)
+    sampler.start()
+    threads = []
+    for i in range(args.users):
+        t = threading.Thread(target=run_user, args=(i, args, mix, recorder, stop_at), daemon=True)
+        t.start()
+        threads.append(t)
+        time.sleep(args.ramp / max(args.users, 1))
+    for t in threads:
+        t.join(timeout=args.duration + args.timeout + 30)
+    stop_event.set()
+    sampler.join(timeout=5)
+    duration = max(time.perf_counter() - recorder.started, 1e-9)
+    return {'summary': summarize(recorder.samples, duration), 'pool_timeline': timeline, 'duration_s': round(duration, 1)}
+
+
+def print_report(result):
+    summary = result['summary']
+    print(f"\n{'endpoint':34} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for endpoint in sorted(summary, key=lambda e: (e == 'ALL', e)):
+        s = summary[endpoint]
+        print(f"{endpoint:34} {s['count']:>7} {s['rps']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['error_rate'] * 100:>6.2f}%")
+    if result['pool_timeline']:
+        print('\nDB pool over time (t s: in use/idle connections, mean checkout wait)')
+        for p in result['pool_timeline']:
+            wait = f"{p['wait_ms']:.2f} ms" if p['wait_ms'] is not None else '-'
+            print(f"  {p['t']:>6}: {p['in_use']:>4.0f}/{p['idle']:<4.0f} wait {wait}")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=2):
+                return True
+        except urllib.error.HTTPError:
+            return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+
+def run_sweep(args):
+    rows = []
+    sweep_key = os.urandom(24).hex()
+    for workers, threads, pool in itertools.product(args.sweep_workers, args.sweep_threads, args.sweep_pool):
+        port = _free_port()
+        env = dict(os.environ, DB_POOL_MAX_CONN=str(pool), METRICS_TOKEN=args.metrics_token or '')
+        # Every worker must sign sessions with the same key or logins only work on one of them
+        env.setdefault('SECRET_FLASK_KEY', sweep_key)
+        if args.db_url:
+            env['SUPABASE_DB_URL'] = args.db_url
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads), '-k', 'gthread',
+               '-t', '120', '-b', f"127.0.0.1:{port}", 'app:app']
+        print(f"\n=== workers={workers} threads={threads} pool={pool} ===")
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            args.base_url = f"http://127.0.0.1:{port}"
+            if not _wait_ready(args.base_url):
+                print('  gunicorn did not become ready; skipping')
+                continue
+            result = run_load(args)
+            print_report(result)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        overall = result['summary'].get('ALL', {})
+        waits = [p['wait_ms'] for p in result['pool_timeline'] if p['wait_ms'] is not None]
+        rows.append({
+            'workers': workers, 'threads': threads, 'pool': pool,
+            'rps': overall.get('rps', 0.0), 'p50_ms': overall.get('p50_ms', 0.0),
+            'p95_ms': overall.get('p95_ms', 0.0), 'p99_ms': overall.get('p99_ms', 0.0),
+            'error_rate': overall.get('error_rate', 0.0),
+            'max_pool_used': max((p['in_use'] for p in result['pool_timeline']), default=0),
+            'max_wait_ms': max(waits, default=0.0),
+        })
+    print(f"\n{'workers':>7} {'threads':>7} {'pool':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'pool used':>9} {'max wait':>9}")
+    for r in rows:
+        print(f"{r['workers']:>7} {r['threads']:>7} {r['pool']:>5} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['error_rate'] * 100:>6.2f}% "
+              f"{r['max_pool_used']:>9.0f} {r['max_wait_ms']:>7.2f}ms")
+    return rows
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(',') if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the app with seeded retailer and consumer sessions')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000', help='App to test (ignored when sweeping)')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load per run')
+    parser.add_argument('--ramp', type=float, default=5.0, help='Seconds over which users start')
+    parser.add_argument('--think', type=float, default=1.0, help='Mean think time between pages (s)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout (s)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Scenario weights (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--seeded-retailers', type=int, default=70, help='--retailers used for seed_synthetic.py')
+    parser.add_argument('--seeded-consumers', type=int, default=200, help='--consumers used for seed_synthetic.py')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--metrics-token', default=os.getenv('METRICS_TOKEN', ''))
+    parser.add_argument('--sample-interval', type=float, default=2.0, help='Seconds between /metrics scrapes')
+    parser.add_argument('--db-url', help='SUPABASE_DB_URL for the gunicorn processes started by a sweep')
+    parser.add_argument('--sweep-workers', type=_int_list, help='e.g. 1,2,4')
+    parser.add_argument('--sweep-threads', type=_int_list, help='e.g. 8,16')
+    parser.add_argument('--sweep-pool', type=_int_list, help='DB_POOL_MAX_CONN values, e.g. 8,16')
+    parser.add_argument('--json', help='Write results to this path')
+    args = parser.parse_args()
+
+    if args.sweep_workers or args.sweep_threads or args.sweep_pool:
+        args.sweep_workers = args.sweep_workers or [2]
+        args.sweep_threads = args.sweep_threads or [16]
+        args.sweep_pool = args.sweep_pool or [16]
+        result = run_sweep(args)
+    else:
+        result = run_load(args)
+        print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2), encoding='utf-8')
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
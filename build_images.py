@@ -0,0 +1,153 @@
+"""Build resized WebP/AVIF variants of everything in image/ plus a manifest.
+
+Each source image gets one file per (width, format), named with a hash of the
+source bytes and the build settings, e.g. `rice10.640.3f9c2a1b7d.webp`, so
+the files can be cached forever: a changed source image gets new names.
+`image/_variants/manifest.json` maps the original name to its variants;
+app.py loads it once and serves the files from /image/v/ with an immutable
+Cache-Control header. Unchanged images are skipped on re-runs.
+
+    python build_images.py                      # default widths and formats
+    python build_images.py --widths 480,960 --formats webp --clean
+
+Needs Pillow (AVIF through Pillow >= 11.3 or the pillow-avif-plugin package);
+without it nothing is built and the app keeps serving the original PNGs.
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SOURCE_DIR = ROOT / 'image'
+VARIANTS_DIR = SOURCE_DIR / '_variants'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+DEFAULT_FORMATS = ('avif', 'webp')
+# Quality per format: AVIF holds up at a lower setting than WebP
+DEFAULT_QUALITY = {'avif': 50, 'webp': 78}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+
+def load_pillow():
+    """Return PIL.Image, or None when Pillow is not installed."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        import pillow_avif  # noqa: F401  (registers AVIF on Pillow < 11.3)
+    except ImportError:
+        pass
+    return Image
+
+
+def supported_formats(Image, wanted):
+    from PIL import features
+    available = []
+    for fmt in wanted:
+        if features.check(fmt) or fmt.upper() in Image.SAVE:
+            available.append(fmt)
+        else:
+            print(f"[WARN] Pillow cannot write {fmt}; skipping that format")
+    return available
+
+
+def slug(rel_path: str) -> str:
+    stem = os.path.splitext(rel_path)[0].lower()
+    return re.sub(r'[^a-z0-9]+', '-', stem).strip('-') or 'image'
+
+
+def source_images(source_dir: Path, out_dir: Path):
+    for path in sorted(source_dir.rglob('*')):
+        if path.is_file() and path.suffix.lower() in SOURCE_EXTENSIONS and out_dir not in path.parents:
+            yield path.relative_to(source_dir).as_posix(), path
+
+
+def build_one(Image, path: Path, rel: str, out_dir: Path, widths, formats, quality):
+    data = path.read_bytes()
+    settings = json.dumps([sorted(widths), formats, [quality[f] for f in formats]])
+    digest = hashlib.sha256(data + settings.encode()).hexdigest()[:10]
+    with Image.open(path) as im:
+        im.load()
+        width, height = im.size
+        has_alpha = im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info
+        im = im.convert('RGBA' if has_alpha else 'RGB')
+        # Never upscale; the original width is always one of the candidates
+        targets = sorted({w for w in widths if w < width} | {width})
+        variants = []
+        for fmt in formats:
+            for w in targets:
+                name = f"{slug(rel)}.{w}.{digest}.{fmt}"
+                out = out_dir / name
+                if not out.exists():
+                    h = max(1, round(height * w / width))
+                    resized = im if w == width else im.resize((w, h), Image.LANCZOS)
+                    tmp = out.with_suffix(out.suffix + '.tmp')
+                    options = {'method': 6} if fmt == 'webp' else {}
+                    resized.save(tmp, format=fmt.upper(), quality=quality[fmt], **options)
+                    os.replace(tmp, out)
+                variants.append({'file': name, 'width': w, 'format': fmt, 'type': MIME_TYPES[fmt],
+                                 'bytes': out.stat().st_size})
+    return {'hash': digest, 'width': width, 'height': height, 'bytes': len(data), 'variants': variants}
+
+
+def build(source_dir: Path = SOURCE_DIR, out_dir: Path = VARIANTS_DIR, widths=DEFAULT_WIDTHS,
+          formats=DEFAULT_FORMATS, quality=None, clean: bool = False):
+    """Build every variant and write the manifest; returns the manifest dict or None without Pillow."""
+    Image = load_pillow()
+    if Image is None:
+        print('[WARN] Pillow is not installed; no image variants built (originals will be served)')
+        return None
+    quality = {**DEFAULT_QUALITY, **(quality or {})}
+    formats = supported_formats(Image, formats)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    images = {}
+    for rel, path in source_images(source_dir, out_dir):
+        try:
+            images[rel] = build_one(Image, path, rel, out_dir, widths, formats, quality)
+        except Exception as e:
+            print(f"[WARN] Skipping {rel}: {e}")
+            continue
+        entry = images[rel]
+        best = min((v['bytes'] for v in entry['variants'] if v['width'] == entry['width']), default=entry['bytes'])
+        print(f"  {rel:55} {entry['bytes'] / 1024:8.1f} KB -> {best / 1024:7.1f} KB at full width, "
+              f"{len(entry['variants'])} variants")
+    manifest = {'version': 1, 'formats': formats, 'images': images}
+    tmp = out_dir / (MANIFEST_NAME + '.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+    if clean:
+        keep = {v['file'] for entry in images.values() for v in entry['variants']} | {MANIFEST_NAME}
+        for stale in out_dir.iterdir():
+            if stale.is_file() and stale.name not in keep:
+                stale.unlink()
+                print(f"  removed stale {stale.name}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build resized WebP/AVIF image variants and a hashed manifest')
+    parser.add_argument('--source', default=str(SOURCE_DIR))
+    parser.add_argument('--out', default=str(VARIANTS_DIR))
+    parser.add_argument('--widths', default=','.join(str(w) for w in DEFAULT_WIDTHS),
+                        help='Comma-separated target widths in px (never larger than the original)')
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS), help='Comma-separated: avif,webp')
+    parser.add_argument('--clean', action='store_true', help='Delete variant files no longer in the manifest')
+    args = parser.parse_args()
+
+    widths = [int(w) for w in args.widths.split(',') if w.strip()]
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip().lower() in MIME_TYPES]
+    manifest = build(Path(args.source), Path(args.out), widths, formats, clean=args.clean)
+    if manifest is None:
+        # Not an error: deploys without Pillow still work, just with the originals
+        sys.exit(0)
+    print(f"Wrote {Path(args.out) / MANIFEST_NAME} ({len(manifest['images'])} images)")
+
+
+if __name__ == '__main__':
+    main()
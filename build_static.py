@@ -0,0 +1,115 @@
+"""Fingerprint and precompress static/ assets for far-future caching.
+
+For every .js/.css/.svg/.json file in static/ this writes a copy named after a
+hash of its contents (`script.1a2b3c4d5e.js`) plus `.gz` and `.br` siblings to
+static/_dist/, and a manifest mapping the logical name to the hashed one.
+app.py resolves `asset_url('script.js')` through the manifest and serves
+/assets/<hashed name> with the best encoding the browser accepts and
+`Cache-Control: immutable`; a changed file gets a new name, so nothing stale
+is ever served.
+
+    python build_static.py
+    python build_static.py --clean     # also delete outputs of older builds
+
+Brotli copies need the `brotli` package; without it only gzip is written.
+"""
+import os
+import gzip
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+STATIC_DIR = ROOT / 'static'
+DIST_DIR = STATIC_DIR / '_dist'
+MANIFEST_NAME = 'manifest.json'
+EXTENSIONS = ('.js', '.css', '.svg', '.json', '.txt')
+# Smaller than this, the encoded copy is not worth a second request variant
+MIN_COMPRESS_BYTES = 512
+
+
+def load_brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def source_files(static_dir: Path, dist_dir: Path):
+    for path in sorted(static_dir.rglob('*')):
+        if path.is_file() and path.suffix.lower() in EXTENSIONS and dist_dir not in path.parents:
+            yield path.relative_to(static_dir).as_posix(), path
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_one(rel: str, path: Path, dist_dir: Path, brotli):
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    stem, ext = os.path.splitext(rel)
+    hashed = f"{stem}.{digest[:10]}{ext}"
+    out = dist_dir / hashed
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if not out.exists():
+        write_atomic(out, data)
+    sizes = {'identity': len(data)}
+    if len(data) >= MIN_COMPRESS_BYTES:
+        gz = out.with_name(out.name + '.gz')
+        if not gz.exists():
+            # mtime=0 keeps the output byte-identical across builds
+            write_atomic(gz, gzip.compress(data, compresslevel=9, mtime=0))
+        sizes['gzip'] = gz.stat().st_size
+        if brotli is not None:
+            br = out.with_name(out.name + '.br')
+            if not br.exists():
+                write_atomic(br, brotli.compress(data, quality=11, mode=brotli.MODE_TEXT))
+            sizes['br'] = br.stat().st_size
+    # Only keep encodings that are actually smaller
+    encodings = [e for e in ('br', 'gzip') if e in sizes and sizes[e] < sizes['identity']]
+    return {'file': hashed, 'sha256': digest, 'encodings': encodings, 'bytes': sizes}
+
+
+def build(static_dir: Path = STATIC_DIR, dist_dir: Path = DIST_DIR, clean: bool = False):
+    brotli = load_brotli()
+    if brotli is None:
+        print('[WARN] brotli is not installed; writing gzip copies only')
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    assets = {}
+    for rel, path in source_files(static_dir, dist_dir):
+        entry = build_one(rel, path, dist_dir, brotli)
+        assets[rel] = entry
+        sizes = entry['bytes']
+        print(f"  {rel:30} -> {entry['file']:40} {sizes['identity'] / 1024:7.1f} KB"
+              + ''.join(f"  {e} {sizes[e] / 1024:6.1f} KB" for e in entry['encodings']))
+    manifest = {'version': 1, 'assets': assets}
+    write_atomic(dist_dir / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    if clean:
+        keep = {MANIFEST_NAME}
+        for entry in assets.values():
+            keep.add(entry['file'])
+            keep.update(f"{entry['file']}.{'gz' if e == 'gzip' else e}" for e in ('gzip', 'br'))
+        for stale in dist_dir.rglob('*'):
+            if stale.is_file() and stale.relative_to(dist_dir).as_posix() not in keep:
+                stale.unlink()
+                print(f"  removed stale {stale.relative_to(dist_dir).as_posix()}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write hashed, precompressed copies of static/ assets')
+    parser.add_argument('--static', default=str(STATIC_DIR))
+    parser.add_argument('--out', default=str(DIST_DIR))
+    parser.add_argument('--clean', action='store_true', help='Delete files from previous builds')
+    args = parser.parse_args()
+    manifest = build(Path(args.static), Path(args.out), clean=args.clean)
+    print(f"Wrote {Path(args.out) / MANIFEST_NAME} ({len(manifest['assets'])} assets)")
+
+
+if __name__ == '__main__':
+    main()
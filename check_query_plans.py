@@ -0,0 +1,478 @@
+"""Query-plan regression check for every statement shape app.py issues.
+
+Runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) on a catalog of the hot
+statements (the prepared read shapes from app.py plus the plain lookups and
+writes; writes are rolled back) and fails when
+
+  - a plan sequentially scans a large table (--large-table-rows),
+  - a sort spills to disk,
+  - a statement that filters on a partition key (sales.year,
+    retailer_inventory.date_posted) still scans every partition,
+  - a statement's estimated total cost grew past --threshold against a
+    baseline saved with --save, or
+  - a period-hierarchy conflict (duplicate yearly/monthly entry, finer
+    entry under one) raises an error app.py has no message for.
+
+Problems matching KNOWN_ISSUES are accepted trade-offs: they are printed as
+warnings and do not fail the run.
+
+app.py runs its reads as prepared statements, which Postgres switches to a
+generic plan after a few executions; --generic-plans checks that plan (with
+runtime partition pruning) instead of one planned for the sample values.
+
+For every failing scan it suggests an index built from the filter and sort
+keys of the plan. Scans whose only filters are substring matches
+(LIKE '%...%') are reported as warnings with a pg_trgm suggestion instead,
+since no btree index can serve them.
+
+    # seed a local database at the requested scale, then check
+    python check_query_plans.py --db-url postgresql://postgres@localhost:5432/anilytics \\
+        --migrate --seed-retailers 2000 --seed-inventory-days 365 --save query_plans.json
+    # later, against the same data
+    python check_query_plans.py --db-url ... --compare query_plans.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import itertools
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+import psycopg2
+import psycopg2.errors
+
+ROOT = Path(__file__).parent
+SCAN_NODES = ('Seq Scan', 'Parallel Seq Scan')
+# Partition-key predicates: statements with one of these must prune partitions
+PRUNE_RE = re.compile(r'\b(?:year|date_posted)\s*(?:=|>=|<=|>|<|BETWEEN\b)', re.IGNORECASE)
+COLUMN_RE = re.compile(r'\(?\b(?:lower\()?\(?([a-z_][a-z0-9_]*)\)?(?:\)::text)?\s*(=|>=|<=|>|<|~~)')
+# Accepted problems: (statement label, problem) patterns reported as known
+# issues instead of failing the run. Keep each one narrow and say why.
+KNOWN_ISSUES = [
+    # browse_latest: DISTINCT ON keeps the newest posting per retailer and
+    # variety among the rows that pass the filters, so with price or area
+    # filters the planner sorts every matching posting (the index path over
+    # idx_ri_retailer_variety_posted is faster but estimated dearer). Filtering
+    # after the DISTINCT ON would change which rows browse shows.
+    (re.compile(r'browse_latest_[0-9a-f]+$'), re.compile(r'Sort spilled ')),
+]
+
+
+def sample_values(cur):
+    """Representative parameters taken from the data in the database."""
+    cur.execute("SELECT user_id FROM sales GROUP BY user_id ORDER BY count(*) DESC LIMIT 1")
+    row = cur.fetchone()
+    user_id = row[0] if row else '00000000-0000-0000-0000-000000000000'
+    cur.execute(
+        "SELECT ri.retailer_id, max(ri.date_posted), min(ri.id::text) FROM retailer_inventory ri "
+        "GROUP BY ri.retailer_id ORDER BY count(*) DESC LIMIT 1"
+    )
+    row = cur.fetchone()
+    retailer_id, last_date, inv_id = row if row else (user_id, datetime.now().date(), user_id)
+    cur.execute("SELECT rice_variety FROM retailer_inventory WHERE retailer_id = %s AND rice_variety IS NOT NULL "
+                "GROUP BY 1 ORDER BY count(*) DESC LIMIT 1", (retailer_id,))
+    variety = cur.fetchone()
+    cur.execute("SELECT email, retailer_area FROM profiles WHERE id = %s", (retailer_id,))
+    row = cur.fetchone() or ('nobody@example.com', 'Pasay')
+    cur.execute("SELECT id FROM sales WHERE user_id = %s LIMIT 1", (user_id,))
+    sale = cur.fetchone()
+    cur.execute("SELECT max(year) FROM sales WHERE user_id = %s", (user_id,))
+    sales_year = cur.fetchone()[0]
+    cur.execute("SELECT population_band, area, competitor_band FROM market_retailer_metrics(12, %s)", (user_id,))
+    segments = cur.fetchone() or (None, None, None)
+    return {
+        'user_id': user_id,
+        'retailer_id': retailer_id,
+        'email': row[0],
+        'area': (row[1] or 'Pasay').split()[0],
+        'last_date': last_date,
+        'inventory_id': inv_id,
+        'sales_id': sale[0] if sale else user_id,
+        'variety': variety[0] if variety else 'Jasmine',
+        'sales_year': sales_year,
+        'segments': segments,
+    }
+
+
+def _filter_combos(options, exhaustive):
+    """Dicts of keyword filters: none, each alone and all together (or every subset)."""
+    keys = list(options)
+    if exhaustive:
+        subsets = itertools.chain.from_iterable(itertools.combinations(keys, n) for n in range(len(keys) + 1))
+    else:
+        subsets = [()] + [(k,) for k in keys] + [tuple(keys)]
+    for subset in subsets:
+        yield {k: options[k] for k in subset}
+
+
+def build_catalog(app, v, exhaustive=False):
+    """[(label, sql, params)] for every statement shape app.py issues."""
+    catalog = [
+        ('login_profile', app.PREPARED_SQL[app.STMT_LOGIN_PROFILE], (v['email'],)),
+        ('load_sales', app.PREPARED_SQL[app.STMT_LOAD_SALES], (v['user_id'],)),
+        ('register email check', "SELECT id FROM profiles WHERE email = %s", (v['email'],)),
+        ('company profile',
+         "SELECT id, retailer_company, retailer_area, retailer_location FROM profiles "
+         "WHERE id = %s AND (role = 'retailer' OR role IS NULL)", (v['retailer_id'],)),
+        ('inventory get',
+         f"SELECT {app.INVENTORY_COLUMNS} FROM retailer_inventory WHERE id = %s AND retailer_id = %s",
+         (v['inventory_id'], v['retailer_id'])),
+        ('inventory update',
+         f"UPDATE retailer_inventory SET stock_kg = %s WHERE id = %s AND retailer_id = %s "
+         f"RETURNING {app.INVENTORY_COLUMNS}", (1, v['inventory_id'], v['retailer_id'])),
+        ('inventory delete', "DELETE FROM retailer_inventory WHERE id = %s AND retailer_id = %s",
+         (v['inventory_id'], v['retailer_id'])),
+        ('sales delete', "DELETE FROM sales WHERE id = %s AND user_id = %s", (v['sales_id'], v['user_id'])),
+    ]
+    seen = set()
+
+    def add_shape(name, params):
+        if name not in seen:
+            seen.add(name)
+            catalog.append((name, app.PREPARED_SQL[name], tuple(params)))
+
+    day = v['last_date'].isoformat() if v['last_date'] else None
+    list_options = {'date_exact': day, 'date_from': day, 'date_to': day, 'variety': 'jasmine',
+                    'min_price': 40.0, 'max_price': 60.0}
+    for filters in _filter_combos(list_options, exhaustive):
+        add_shape(*app.inventory_list_statement(v['retailer_id'], **filters))
+    browse_options = {'variety': 'jasmine', 'area': v['area'], 'min_price': 40.0, 'max_price': 60.0,
+                      'retailer_id': v['retailer_id']}
+    for filters in _filter_combos(dict(browse_options, date_exact=day), exhaustive):
+        add_shape(*app.inventory_browse_statement(latest=True, **filters))
+    for date_exact in (day, None):
+        for filters in _filter_combos(browse_options, exhaustive):
+            add_shape(*app.inventory_browse_statement(latest=False, date_exact=date_exact, **filters))
+    add_shape(app.STMT_USER_CATALOG, (v['user_id'],))
+    add_shape(app.STMT_MARKET_SELF, (app.MARKET_BENCHMARK_MONTHS, v['user_id']))
+    # The same function without a user is what refresh_market_benchmarks() aggregates
+    catalog.append(('market_self (all retailers)', app.PREPARED_SQL[app.STMT_MARKET_SELF],
+                    (app.MARKET_BENCHMARK_MONTHS, None)))
+    add_shape(app.STMT_MARKET_BENCHMARKS, v['segments'])
+    labels = list(app.ANOMALY_LABELS)
+    add_shape(app.STMT_WASTE_ANOMALIES, (v['user_id'], labels, None, None, 50))
+    catalog.append(('waste_anomalies (year)', app.PREPARED_SQL[app.STMT_WASTE_ANOMALIES],
+                    (v['user_id'], labels, v['sales_year'], v['sales_year'], 50)))
+    add_shape(app.STMT_WASTE_BASELINES, (v['user_id'], v['user_id']))
+    year = v['last_date'].year if v['last_date'] else None
+    add_shape(app.STMT_PROGRESS_COVERAGE, (year, v['user_id'], v['user_id'], year, year))
+    if v['last_date']:
+        since = v['last_date'] - timedelta(days=365)
+        for retailer_id in (None, v['retailer_id']):
+            add_shape(*app.price_history_statement(v['variety'], since, v['last_date'], retailer_id))
+    return catalog
+
+
+def table_sizes(cur):
+    cur.execute(
+        "SELECT c.relname, greatest(c.reltuples, 0)::bigint FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')"
+    )
+    return dict(cur.fetchall())
+
+
+def partition_parents(cur):
+    """{partition: parent} and {parent: partition count} for partitioned public tables."""
+    cur.execute(
+        "SELECT c.relname, p.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "JOIN pg_namespace n ON n.oid = p.relnamespace "
+        "WHERE n.nspname = 'public' AND p.relkind = 'p' AND c.relkind IN ('r', 'p')"
+    )
+    parents, counts = {}, {}
+    for child, parent in cur.fetchall():
+        parents[child] = parent
+        counts[parent] = counts.get(parent, 0) + 1
+    return parents, counts
+
+
+def existing_indexes(cur):
+    """{table: [indexdef, ...]} for the public schema."""
+    cur.execute("SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = 'public'")
+    out = {}
+    for table, indexdef in cur.fetchall():
+        out.setdefault(table, []).append(indexdef)
+    return out
+
+
+def walk(node, parents=()):
+    yield node, parents
+    for child in node.get('Plans', []):
+        yield from walk(child, parents + (node,))
+
+
+def filter_columns(expr):
+    """(equality columns, range columns) compared in a plan Filter.
+
+    Substring matches (LIKE '%...%', shown as ~~) are skipped: no btree can serve them.
+    """
+    eq, rng = [], []
+    for column, op in COLUMN_RE.findall(expr or ''):
+        if op == '~~' or column in ('text', 'numeric', 'date'):
+            continue
+        target = eq if op == '=' else rng
+        if column not in eq and column not in rng:
+            target.append(column)
+    return eq, rng
+
+
+def substring_only(root):
+    """True when every Filter in the plan is a substring match, so only a trigram index could help."""
+    filters = [n.get('Filter') for n, _p in walk(root) if n.get('Filter')]
+    return bool(filters) and all('~~' in f and not any(filter_columns(f)) for f in filters)
+
+
+def _index_columns(indexdef):
+    m = re.search(r'USING \w+ \((.*)\)', indexdef)
+    return [c.strip() for c in m.group(1).split(',')] if m else []
+
+
+def suggest_index(node, parents, indexes):
+    """CREATE INDEX statement for a scan node, or None if nothing useful can be derived."""
+    table = node.get('Relation Name')
+    alias = node.get('Alias', table)
+    eq, rng = filter_columns(node.get('Filter'))
+    # Equality columns lead, then the sort order the plan had to produce, then ranges
+    columns = list(eq)
+    for parent in reversed(parents):
+        if parent.get('Node Type') in ('Sort', 'Incremental Sort'):
+            for key in parent.get('Sort Key', []):
+                key = key.replace(f"{alias}.", '')
+                if '(' not in key and key.split()[0] not in [c.split()[0] for c in columns]:
+                    columns.append(key)
+            break
+    columns += [c for c in rng if c not in [k.split()[0] for k in columns]]
+    if not columns:
+        return None
+    for indexdef in indexes.get(table, []):
+        if _index_columns(indexdef)[:len(columns)] == columns:
+            return None
+    parts = '_'.join(c.split()[0].strip('"') for c in columns)
+    name = f"idx_{table}_{parts}"[:63]
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON public.{table} ({', '.join(columns)});"
+
+
+def trigram_hint(node):
+    m = re.search(r'lower\(\(?(\w+\.)?(\w+)\)?', node.get('Filter') or '')
+    if not m:
+        return None
+    table, column = node.get('Relation Name'), m.group(2)
+    return (f"CREATE EXTENSION IF NOT EXISTS pg_trgm; CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            f"idx_{table}_{column}_trgm ON public.{table} USING gin (lower({column}) gin_trgm_ops);")
+
+
+def explain(cur, sql, params, generic=False):
+    if generic:
+        from app import _to_positional
+        # The plan a prepared statement settles on, as app.execute_prepared runs it
+        cur.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        cur.execute("DEALLOCATE ALL")
+        cur.execute(f"PREPARE plan_check AS {_to_positional(sql)}")
+        args = f" ({', '.join(['%s'] * len(params))})" if params else ''
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) EXECUTE plan_check{args}", params)
+    else:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    doc = cur.fetchone()[0]
+    return doc[0] if isinstance(doc, list) else json.loads(doc)[0]
+
+
+def unpruned_tables(root, parents, counts):
+    """Partitioned tables whose every partition was actually scanned by the plan."""
+    scanned = {}
+    for node, _p in walk(root):
+        child = node.get('Relation Name')
+        if child in parents and node.get('Actual Loops', 0) > 0:
+            scanned.setdefault(parents[child], set()).add(child)
+    return [f"{parent} ({len(children)}/{counts[parent]} partitions)"
+            for parent, children in sorted(scanned.items())
+            if counts[parent] > 1 and len(children) == counts[parent]]
+
+
+def check(cur, catalog, sizes, indexes, large_rows, partitions=({}, {}), generic=False):
+    results = {}
+    parents, counts = partitions
+    for label, sql, params in catalog:
+        try:
+            plan = explain(cur, sql, params, generic)
+        finally:
+            cur.connection.rollback()
+        root = plan['Plan']
+        problems, warnings, suggestions = [], [], []
+        shared_hit = root.get('Shared Hit Blocks', 0)
+        shared_read = root.get('Shared Read Blocks', 0)
+        only_substring = substring_only(root)
+        for node, parents in walk(root):
+            if node.get('Node Type') in SCAN_NODES:
+                table = node.get('Relation Name')
+                rows = sizes.get(table, 0)
+                if rows < large_rows:
+                    continue
+                message = f"{node['Node Type']} on {table} (~{rows:,} rows)"
+                if only_substring:
+                    warnings.append(message + ', substring filter only')
+                    hint = next(filter(None, (trigram_hint(n) for n, _p in walk(root))), None)
+                else:
+                    problems.append(message)
+                    hint = suggest_index(node, parents, indexes)
+                if hint and hint not in suggestions:
+                    suggestions.append(hint)
+            elif node.get('Sort Space Type') == 'Disk':
+                problems.append(f"{node['Node Type']} spilled {node.get('Sort Space Used', 0):,} kB to disk")
+        if PRUNE_RE.search(sql):
+            for table in unpruned_tables(root, parents, counts):
+                problems.append(f"no partition pruning on {table}")
+        known = [p for p in problems
+                 if any(label_re.match(label) and problem_re.match(p) for label_re, problem_re in KNOWN_ISSUES)]
+        problems = [p for p in problems if p not in known]
+        warnings.extend('known issue: ' + p for p in known)
+        results[label] = {
+            'total_cost': root.get('Total Cost', 0.0),
+            'execution_ms': plan.get('Execution Time', 0.0),
+            'planning_ms': plan.get('Planning Time', 0.0),
+            'buffers': shared_hit + shared_read,
+            'node': root.get('Node Type'),
+            'problems': problems,
+            'warnings': warnings,
+            'suggestions': suggestions,
+        }
+    return results
+
+
+def check_period_conflicts(cur, app, year):
+    """Insert conflicting sales entries for a throwaway user and check that each
+    error still maps to a message in app.period_conflict_message(). Partitions
+    report their own index names, so a mapping that only knows the parent's
+    would silently fall back to the generic error. Rolled back."""
+    problems = []
+    cases = [
+        ('duplicate yearly', [('yearly', None), ('yearly', None)]),
+        ('duplicate monthly', [('monthly', 1), ('monthly', 1)]),
+        ('monthly under yearly', [('yearly', None), ('monthly', 2)]),
+        ('weekly under monthly', [('monthly', 3), ('weekly', 3)]),
+    ]
+    try:
+        cur.execute("INSERT INTO profiles (email, role) VALUES ('check-query-plans@local.local', 'retailer') RETURNING id")
+        user_id = cur.fetchone()[0]
+        for label, rows in cases:
+            cur.execute("SAVEPOINT period_case")
+            try:
+                for level, month in rows:
+                    cur.execute(
+                        "INSERT INTO sales (user_id, week_date, data_level, year, month) VALUES (%s, %s, %s, %s, %s)",
+                        (user_id, f"{year}-{month or 1:02d}-01", level, year, month)
+                    )
+                problems.append(f"{label}: no error raised")
+            except (psycopg2.errors.UniqueViolation, psycopg2.errors.CheckViolation) as e:
+                if app.period_conflict_message(e.diag.constraint_name, year, month) is None:
+                    problems.append(f"{label}: constraint {e.diag.constraint_name} has no message")
+            cur.execute("ROLLBACK TO SAVEPOINT period_case")
+    finally:
+        cur.connection.rollback()
+    return problems
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for label, r in results.items():
+        base = baseline.get('results', {}).get(label)
+        if base and base['total_cost'] and r['total_cost'] > base['total_cost'] * (1.0 + threshold):
+            change = (r['total_cost'] / base['total_cost'] - 1.0) * 100.0
+            regressions.append(f"{label}: cost {base['total_cost']:.1f} -> {r['total_cost']:.1f} (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN every hot statement and flag plan regressions')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending migrations first')
+    parser.add_argument('--seed-retailers', type=int, help='Run seed_synthetic.py with this many retailers first')
+    parser.add_argument('--seed-consumers', type=int, default=1000)
+    parser.add_argument('--seed-inventory-days', type=int, default=365)
+    parser.add_argument('--all-shapes', action='store_true',
+                        help='Check every filter combination instead of none/each/all')
+    parser.add_argument('--generic-plans', action='store_true',
+                        help='Check the generic plans prepared statements end up with (runtime pruning)')
+    parser.add_argument('--large-table-rows', type=int, default=10000,
+                        help='Sequential scans over tables with at least this many rows fail (default: %(default)s)')
+    parser.add_argument('--save', help='Write results as a JSON baseline to this path')
+    parser.add_argument('--compare', help='Compare estimated costs against a baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed cost growth before flagging (default: 0.25 = 25%%)')
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / '.env')
+    db_url = (args.db_url or os.getenv('SUPABASE_DB_URL') or '').strip().strip('"').strip("'")
+    if not db_url:
+        print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+        sys.exit(1)
+
+    if args.migrate:
+        subprocess.run([sys.executable, str(ROOT / 'migrate_supabase.py'), '--db-url', db_url], check=True)
+    if args.seed_retailers:
+        subprocess.run([
+            sys.executable, str(ROOT / 'seed_synthetic.py'), '--db-url', db_url, '--replace',
+            '--retailers', str(args.seed_retailers), '--consumers', str(args.seed_consumers),
+            '--inventory-days', str(args.seed_inventory_days),
+        ], check=True)
+
+    import app
+
+    conn = psycopg2.connect(db_url)
+    cur = conn.cursor()
+    cur.execute("ANALYZE")
+    conn.commit()
+    sizes = table_sizes(cur)
+    indexes = existing_indexes(cur)
+    values = sample_values(cur)
+    catalog = build_catalog(app, values, args.all_shapes)
+    results = check(cur, catalog, sizes, indexes, args.large_table_rows, partition_parents(cur), args.generic_plans)
+    period_problems = check_period_conflicts(cur, app, values['sales_year'])
+    conn.close()
+
+    failures = 0
+    print(f"{'statement':28} {'cost':>12} {'exec ms':>9} {'buffers':>8}  top node")
+    for label, r in results.items():
+        flag = '  <-- ' + '; '.join(r['problems']) if r['problems'] else ''
+        if r['warnings']:
+            flag += '  (warning: ' + '; '.join(r['warnings']) + ')'
+        print(f"{label:28} {r['total_cost']:12.1f} {r['execution_ms']:9.2f} {r['buffers']:8}  {r['node']}{flag}")
+        failures += bool(r['problems'])
+
+    if period_problems:
+        print('\nPeriod conflicts without a user-facing message:')
+        for line in period_problems:
+            print('  ' + line)
+        failures += len(period_problems)
+
+    suggestions = sorted({s for r in results.values() for s in r['suggestions']})
+    if suggestions:
+        print('\nSuggested indexes:')
+        for s in suggestions:
+            print('  ' + s)
+
+    if args.save:
+        payload = {'meta': {'created_at': datetime.now().isoformat(), 'table_rows': sizes}, 'results': results}
+        Path(args.save).write_text(json.dumps(payload, indent=2, default=str), encoding='utf-8')
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text(encoding='utf-8')), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} cost regression(s) above {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print('  ' + line)
+            failures += len(regressions)
+
+    if failures:
+        print(f"\nFAILED: {failures} problem(s)")
+        sys.exit(1)
+    print('\nOK: no sequential scans over large tables' + (' and no cost regressions' if args.compare else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Gunicorn settings; gunicorn loads ./gunicorn.conf.py automatically.
+
+Command-line flags (see render.yaml) still take precedence over anything here.
+"""
+import os
+import shutil
+import tempfile
+
+# Shared directory so /metrics aggregates samples from every worker process.
+# Must be set before any worker imports prometheus_client.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'anilytics-metrics')
+)
+
+
+def on_starting(server):
+    # Stale files from a previous run would be summed into the new one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # With --preload the master imports app.py once and forks the workers;
+    # the DB pool and warm-up must happen in each worker, not in the master.
+    if os.environ.get('DB_POOL_WARM', 'true').lower() == 'false':
+        return
+    import sys
+    app_module = sys.modules.get('app')
+    if app_module is not None and hasattr(app_module, 'start_warmup'):
+        app_module.start_warmup()
@@ -0,0 +1,283 @@
+"""Columnar on-disk archive of old retailer_inventory months.
+
+maintain_partitions() (migration 0007) detaches inventory months past the
+retention window into the inventory_archive schema. --export writes each of
+those tables to an Arrow IPC file in INVENTORY_ARCHIVE_DIR. With --drop it
+also drops the exported tables, so Postgres no longer stores the cold months;
+only do that when every app instance reads the same directory, since app.py
+falls back to the inventory_archive tables for months it has no file for.
+ArchiveReader memory-maps the files and answers variety/date-range price
+queries. app.py merges its answers with the live table for /api/price-history.
+
+Each file holds one month. Rows are sorted by (rice_variety, date_posted) and
+written as one record batch per variety. The schema metadata maps each
+variety to its batch, so a query reads only its own variety's pages. Files
+are uncompressed by default, so the reader uses the mapped pages directly
+(zero-copy). --compression zstd|lz4 makes the files smaller, but every read
+then decompresses its batch.
+
+    python inventory_archive.py --export                 # write files for archived months
+    python inventory_archive.py --export --drop          # ... then drop the exported tables
+    python inventory_archive.py --status                 # files, rows, varieties
+    python inventory_archive.py --query Jasmine --from 2024-01-01 --to 2024-06-30
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+ROOT = Path(__file__).parent
+ARCHIVE_DIR = Path(os.getenv('INVENTORY_ARCHIVE_DIR', str(ROOT / 'archive' / 'inventory')))
+FILE_RE = re.compile(r'^retailer_inventory_p(\d{4})(\d{2})\.arrow$')
+META_VARIETIES = b'anilytics.varieties'
+META_ROWS = b'anilytics.rows'
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('retailer_id', pa.string()),
+    ('date_posted', pa.date32()),
+    ('rice_variety', pa.string()),
+    ('stock_kg', pa.float64()),
+    ('price_per_kg', pa.float64()),
+    ('created_at', pa.timestamp('us', tz='UTC')),
+])
+EXPORT_SQL = (
+    "SELECT id::text, retailer_id::text, date_posted, rice_variety, stock_kg::float8, price_per_kg::float8, "
+    "created_at FROM inventory_archive.{table}"
+)
+
+
+def file_month(path):
+    """First day of the month a file holds, or None for foreign files."""
+    m = FILE_RE.match(Path(path).name)
+    return date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+
+def _month_end(first):
+    return (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def write_month(path, table, compression=None):
+    """Write one month sorted by (variety, date), one record batch per variety.
+
+    The file is written next to `path` and renamed over it, so a reader
+    never maps a half-written file.
+    """
+    table = table.cast(SCHEMA).sort_by([
+        ('rice_variety', 'ascending'), ('date_posted', 'ascending'), ('created_at', 'ascending'),
+    ])
+    varieties = {}
+    batches = []
+    start = 0
+    values = table.column('rice_variety').to_pylist()
+    for i in range(1, len(values) + 1):
+        if i == len(values) or values[i] != values[start]:
+            batch = table.slice(start, i - start).combine_chunks().to_batches()[0]
+            varieties[values[start] if values[start] is not None else ''] = len(batches)
+            batches.append(batch)
+            start = i
+    schema = SCHEMA.with_metadata({META_VARIETIES: json.dumps(varieties), META_ROWS: str(table.num_rows)})
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    tmp = Path(str(path) + '.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch.replace_schema_metadata(None))
+    os.replace(tmp, path)
+    return table.num_rows
+
+
+class ArchiveReader:
+    """Memory-mapped reads over the month files in an archive directory.
+
+    Open files are cached per (path, mtime); a re-export replaces the file,
+    so the next query maps the new one while earlier readers keep theirs.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = Path(directory)
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def files(self):
+        """[(month_start, path)] in month order."""
+        if not self.directory.is_dir():
+            return []
+        found = [(file_month(p), p) for p in self.directory.iterdir()]
+        return sorted((m, p) for m, p in found if m)
+
+    def _reader(self, path):
+        key = (str(path), path.stat().st_mtime_ns)
+        with self._lock:
+            cached = self._open.get(str(path))
+            if cached and cached[0] == key:
+                return cached[1], cached[2]
+            reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+            meta = reader.schema.metadata or {}
+            varieties = json.loads(meta.get(META_VARIETIES, b'{}'))
+            self._open[str(path)] = (key, reader, varieties)
+            return reader, varieties
+
+    def months(self):
+        """First days of the months that have a file."""
+        return {month for month, _path in self.files()}
+
+    def rows(self, variety, date_from, date_to, retailer_id=None):
+        """Archived listings of one variety in [date_from, date_to] as an Arrow table."""
+        tables = []
+        for month, path in self.files():
+            if month > date_to or _month_end(month) < date_from:
+                continue
+            try:
+                reader, varieties = self._reader(path)
+            except FileNotFoundError:
+                continue
+            index = varieties.get(variety or '')
+            if index is None:
+                continue
+            batch = reader.get_batch(index)
+            # The batch is sorted by date, so the range is a zero-copy slice
+            posted = batch.column('date_posted')
+            start = pc.sum(pc.less(posted, pa.scalar(date_from, pa.date32()))).as_py() or 0
+            stop = pc.sum(pc.less_equal(posted, pa.scalar(date_to, pa.date32()))).as_py() or 0
+            batch = batch.slice(start, stop - start)
+            if retailer_id:
+                batch = batch.filter(pc.equal(batch.column('retailer_id'), retailer_id))
+            tables.append(pa.Table.from_batches([batch]))
+        if not tables:
+            return SCHEMA.empty_table()
+        return pa.concat_tables(tables)
+
+    def daily_prices(self, variety, date_from, date_to, retailer_id=None, extra_rows=None):
+        """Per-day price summary, same fields as the live query in app.py.
+
+        `extra_rows` (dicts with the SCHEMA fields) are listings of the same
+        query still held in the inventory_archive schema for months that also
+        have a file; they replace file rows with the same id.
+        """
+        table = self.rows(variety, date_from, date_to, retailer_id)
+        if extra_rows:
+            extra = pa.Table.from_pylist(extra_rows, schema=SCHEMA)
+            table = pa.concat_tables([
+                table.filter(pc.invert(pc.is_in(table.column('id'), value_set=extra.column('id')))), extra,
+            ])
+        return daily_prices(table)
+
+
+def daily_prices(table):
+    """Per-day price summary of an Arrow table of listings."""
+    if table.num_rows == 0:
+        return []
+    grouped = table.group_by('date_posted').aggregate([
+        ('price_per_kg', 'mean'), ('price_per_kg', 'min'), ('price_per_kg', 'max'),
+        ('price_per_kg', 'count'), ('id', 'count'), ('stock_kg', 'sum'),
+    ]).sort_by('date_posted')
+    return [
+        {'date': r['date_posted'], 'avg_price': r['price_per_kg_mean'], 'min_price': r['price_per_kg_min'],
+         'max_price': r['price_per_kg_max'], 'priced': r['price_per_kg_count'], 'listings': r['id_count'],
+         'stock_kg': r['stock_kg_sum']}
+        for r in grouped.to_pylist()
+    ]
+
+
+def archived_tables(conn):
+    """Names of the month tables in the inventory_archive schema."""
+    rows = conn.execute(
+        "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = 'inventory_archive' AND c.relkind = 'r' ORDER BY c.relname"
+    ).fetchall()
+    return [r[0] for r in rows if FILE_RE.match(r[0] + '.arrow')]
+
+
+def export_table(conn, table, directory, compression=None, drop=False):
+    """Export one archived month; rows already in the file are merged by id."""
+    path = Path(directory) / f"{table}.arrow"
+    with conn.cursor(name=f"export_{table}") as cur:
+        cur.execute(EXPORT_SQL.format(table=table))
+        fresh = pa.Table.from_pylist([dict(zip(SCHEMA.names, r)) for r in cur], schema=SCHEMA)
+    merged = fresh
+    if path.exists():
+        # The month was exported (and maybe dropped) before and rows arrived
+        # since: keep the file's rows the table no longer has
+        old = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all().replace_schema_metadata(None)
+        keep = pc.invert(pc.is_in(old.column('id'), value_set=fresh.column('id')))
+        merged = pa.concat_tables([old.filter(keep), fresh])
+    written = write_month(path, merged, compression)
+    if drop:
+        check = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+        stored = sum(check.get_batch(i).num_rows for i in range(check.num_record_batches))
+        if stored != written:
+            raise RuntimeError(f"{path} holds {stored} rows, expected {written}; not dropping {table}")
+        conn.execute(f'DROP TABLE inventory_archive."{table}"')
+        conn.commit()
+    return written, fresh.num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export archived inventory months to Arrow files and query them')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('--dir', default=str(ARCHIVE_DIR), help='Archive directory (default: %(default)s)')
+    parser.add_argument('--export', action='store_true', help='Export the tables in the inventory_archive schema')
+    parser.add_argument('--drop', action='store_true', help='Drop each table from Postgres once its file is verified')
+    parser.add_argument('--compression', choices=('none', 'lz4', 'zstd'), default='none',
+                        help='IPC buffer compression; anything but none disables zero-copy reads')
+    parser.add_argument('--status', action='store_true', help='List archive files')
+    parser.add_argument('--query', metavar='VARIETY', help='Print the daily prices of a variety from the files')
+    parser.add_argument('--from', dest='date_from', help='YYYY-MM-DD (with --query)')
+    parser.add_argument('--to', dest='date_to', help='YYYY-MM-DD (with --query)')
+    parser.add_argument('--retailer-id', help='Only this retailer (with --query)')
+    args = parser.parse_args()
+    directory = Path(args.dir)
+
+    if args.export:
+        from dotenv import load_dotenv
+        import psycopg
+        from migrate_supabase import normalize_db_url
+
+        load_dotenv(dotenv_path=ROOT / '.env')
+        db_url = normalize_db_url(args.db_url or os.getenv('SUPABASE_DB_URL') or '')
+        if not db_url:
+            print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+            sys.exit(1)
+        directory.mkdir(parents=True, exist_ok=True)
+        compression = None if args.compression == 'none' else args.compression
+        with psycopg.connect(db_url) as conn:
+            tables = archived_tables(conn)
+            if not tables:
+                print('Nothing to export: the inventory_archive schema has no month tables')
+            for table in tables:
+                written, exported = export_table(conn, table, directory, compression, args.drop)
+                size = (directory / f"{table}.arrow").stat().st_size
+                print(f"[INFO] {table}: {exported:,} rows exported, {written:,} in file "
+                      f"({size / 1024 / 1024:.1f} MB){', dropped' if args.drop else ''}")
+
+    if args.status:
+        reader = ArchiveReader(directory)
+        files = reader.files()
+        print(f"{directory}: {len(files)} file(s)")
+        for month, path in files:
+            source, varieties = reader._reader(path)
+            rows = int((source.schema.metadata or {}).get(META_ROWS, b'0'))
+            print(f"  {month:%Y-%m}  {rows:>10,} rows  {len(varieties):>3} varieties  "
+                  f"{path.stat().st_size / 1024 / 1024:8.1f} MB")
+
+    if args.query:
+        date_to = datetime.strptime(args.date_to, '%Y-%m-%d').date() if args.date_to else date.today()
+        date_from = (datetime.strptime(args.date_from, '%Y-%m-%d').date() if args.date_from
+                     else date_to - timedelta(days=365))
+        for day in ArchiveReader(directory).daily_prices(args.query, date_from, date_to, args.retailer_id):
+            print(f"{day['date']}  avg {day['avg_price'] or 0:8.2f}  min {day['min_price'] or 0:8.2f}  "
+                  f"max {day['max_price'] or 0:8.2f}  listings {day['listings']}")
+
+    if not (args.export or args.status or args.query):
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
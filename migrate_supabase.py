@@ -1,89 +1,406 @@
-﻿import os
-import sys
+"""Apply versioned SQL migrations from ./migrations to Supabase Postgres.
+
+Migrations are files named NNNN_description.sql, applied in version order and
+recorded in public.schema_migrations (version, name, checksum, applied_at).
+Editing an applied file is an error, because the database would no longer
+match the file.
+
+A migration runs in a single transaction unless it contains statements that
+Postgres refuses to run inside one (CREATE/DROP INDEX CONCURRENTLY, REINDEX
+CONCURRENTLY, VACUUM, ...) or a CALL of a procedure that commits as it goes
+(batched backfills). Those migrations run statement by statement in
+autocommit mode, so every statement in them must be idempotent (IF [NOT]
+EXISTS). CREATE INDEX CONCURRENTLY on a partitioned table, which Postgres
+does not support, is run as ON ONLY on the parent plus a concurrent build
+and ATTACH per partition. Every statement runs with a short lock_timeout and is retried when
+it cannot get its lock, so a migration never queues behind long transactions
+while blocking the app's reads and writes.
+
+    python migrate_supabase.py --db-url postgresql://...            # apply pending
+    python migrate_supabase.py --dry-run                            # show the plan only
+    python migrate_supabase.py --status                             # applied / pending
+    python migrate_supabase.py --baseline 0001                      # mark an existing schema as applied
+"""
+import os
 import re
+import sys
+import time
+import hashlib
 import argparse
 from pathlib import Path
 
 from dotenv import load_dotenv
 import psycopg
+from psycopg import errors
+
+ROOT = Path(__file__).parent
+MIGRATIONS_DIR = ROOT / 'migrations'
+MIGRATION_RE = re.compile(r'^(\d{4})_([a-z0-9_]+)\.sql$')
+# Serializes concurrent runners (e.g. two deploys starting at once)
+ADVISORY_LOCK_ID = 727274601
+NON_TRANSACTIONAL_RE = re.compile(
+    r'^\s*(create\s+(unique\s+)?index\s+concurrently|drop\s+index\s+concurrently|'
+    r'reindex\b.*\bconcurrently|vacuum\b|alter\s+system\b|create\s+database\b|'
+    r'alter\s+type\b.*\badd\s+value\b|call\b)',
+    re.IGNORECASE | re.DOTALL
+)
+CONCURRENT_INDEX_RE = re.compile(
+    r'^\s*create\s+(unique\s+)?index\s+concurrently\s+(?:if\s+not\s+exists\s+)?'
+    r'("?[\w]+"?)\s+on\s+(?:only\s+)?((?:"?\w+"?\.)?"?\w+"?)',
+    re.IGNORECASE
+)
 
 
-def read_sql_file(sql_path: Path) -> str:
-    sql = sql_path.read_text(encoding='utf-8')
-    return sql
+def normalize_db_url(db_url: str) -> str:
+    db_url = db_url.strip().strip('"').strip("'")
+    if db_url.startswith('postgres://'):
+        db_url = 'postgresql://' + db_url[len('postgres://'):]
+    local = re.search(r'@(localhost|127\.0\.0\.1|\[::1\])[:/]', db_url) or '@' not in db_url
+    if 'sslmode=' not in db_url and not local:
+        sep = '&' if '?' in db_url else '?'
+        db_url = f"{db_url}{sep}sslmode=require"
+    return db_url
 
 
 def split_statements(sql: str):
+    """Split a SQL script into statements.
+
+    Understands single-quoted strings (including E'' escapes), quoted
+    identifiers, $tag$ dollar quotes (function bodies, DO blocks), -- line
+    comments and nested /* */ block comments. Comment-only statements are dropped.
+    """
     statements = []
     buf = []
-    in_single = False
-    in_double = False
-    for ch in sql:
-        if ch == "'" and not in_double:
-            in_single = not in_single
-        elif ch == '"' and not in_single:
-            in_double = not in_double
-        if ch == ';' and not in_single and not in_double:
-            statements.append(''.join(buf).strip())
-            buf = []
-        else:
-            buf.append(ch)
-    tail = ''.join(buf).strip()
-    if tail:
-        statements.append(tail)
-    return [s for s in statements if s and not re.fullmatch(r"--.*", s)]
+    has_code = False
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        nxt = sql[i + 1] if i + 1 < n else ''
+        if ch == '-' and nxt == '-':
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            buf.append(sql[i:end])
+            i = end
+            continue
+        if ch == '/' and nxt == '*':
+            depth, j = 1, i + 2
+            while j < n and depth:
+                if sql.startswith('/*', j):
+                    depth, j = depth + 1, j + 2
+                elif sql.startswith('*/', j):
+                    depth, j = depth - 1, j + 2
+                else:
+                    j += 1
+            if depth:
+                raise ValueError('Unterminated /* comment')
+            buf.append(sql[i:j])
+            i = j
+            continue
+        if ch == "'":
+            escape = i > 0 and sql[i - 1] in 'eE' and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == '_'))
+            j = i + 1
+            while j < n:
+                if escape and sql[j] == '\\':
+                    j += 2
+                    continue
+                if sql[j] == "'":
+                    if j + 1 < n and sql[j + 1] == "'":
+                        j += 2
+                        continue
+                    break
+                j += 1
+            if j >= n:
+                raise ValueError('Unterminated string literal')
+            buf.append(sql[i:j + 1])
+            has_code = True
+            i = j + 1
+            continue
+        if ch == '"':
+            j = sql.find('"', i + 1)
+            while j != -1 and sql.startswith('""', j):
+                j = sql.find('"', j + 2)
+            if j == -1:
+                raise ValueError('Unterminated quoted identifier')
+            buf.append(sql[i:j + 1])
+            has_code = True
+            i = j + 1
+            continue
+        if ch == '$':
+            m = re.match(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$', sql[i:])
+            prev = sql[i - 1] if i else ''
+            if m and not (prev.isalnum() or prev == '_'):
+                tag = m.group(0)
+                end = sql.find(tag, i + len(tag))
+                if end == -1:
+                    raise ValueError(f"Unterminated dollar quote {tag}")
+                buf.append(sql[i:end + len(tag)])
+                has_code = True
+                i = end + len(tag)
+                continue
+        if ch == ';':
+            if has_code:
+                statements.append(''.join(buf).strip())
+            buf, has_code = [], False
+            i += 1
+            continue
+        if not ch.isspace():
+            has_code = True
+        buf.append(ch)
+        i += 1
+    if has_code:
+        statements.append(''.join(buf).strip())
+    return statements
+
+
+def strip_comments(statement: str) -> str:
+    """Leading comments removed, for classifying a statement."""
+    return re.sub(r'^(\s*(--[^\n]*\n|/\*.*?\*/))*', '', statement, flags=re.DOTALL).strip()
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR):
+    """[(version, name, path, checksum, statements, transactional)] sorted by version."""
+    migrations = []
+    seen = set()
+    for path in sorted(directory.glob('*.sql')):
+        m = MIGRATION_RE.match(path.name)
+        if not m:
+            print(f"[WARN] Ignoring {path.name}: expected NNNN_description.sql")
+            continue
+        version, name = m.group(1), m.group(2)
+        if version in seen:
+            raise SystemExit(f"ERROR: duplicate migration version {version}")
+        seen.add(version)
+        sql = path.read_text(encoding='utf-8-sig')
+        statements = split_statements(sql)
+        transactional = not any(NON_TRANSACTIONAL_RE.match(strip_comments(s)) for s in statements)
+        checksum = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+        migrations.append((version, name, path, checksum, statements, transactional))
+    return migrations
+
+
+def ensure_tracking_table(conn):
+    conn.execute(
+        """
+        create table if not exists public.schema_migrations (
+          version text primary key,
+          name text not null,
+          checksum text not null,
+          applied_at timestamptz not null default now()
+        )
+        """
+    )
+
+
+def applied_migrations(conn):
+    # --status and --dry-run must not write DDL: no tracking table yet means nothing applied
+    if conn.execute("select to_regclass('public.schema_migrations') is null").fetchone()[0]:
+        return {}
+    rows = conn.execute("select version, name, checksum, applied_at from public.schema_migrations order by version")
+    return {r[0]: r for r in rows.fetchall()}
+
+
+def record(conn, version, name, checksum):
+    conn.execute(
+        "insert into public.schema_migrations (version, name, checksum) values (%s, %s, %s) "
+        "on conflict (version) do nothing",
+        (version, name, checksum)
+    )
+
+
+def drop_invalid_index(conn, statement, lock_timeout):
+    """A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    IF NOT EXISTS would skip; drop it so the build is retried."""
+    m = CONCURRENT_INDEX_RE.match(strip_comments(statement))
+    if not m:
+        return
+    index = m.group(2).strip('"')
+    row = conn.execute(
+        "select n.nspname from pg_index i join pg_class c on c.oid = i.indexrelid "
+        "join pg_namespace n on n.oid = c.relnamespace where c.relname = %s and not i.indisvalid",
+        (index,)
+    ).fetchone()
+    if row:
+        print(f"  Dropping invalid index {row[0]}.{index} left by an earlier failed build")
+        conn.execute(f"set lock_timeout = '{lock_timeout}'")
+        conn.execute(f'drop index concurrently if exists "{row[0]}"."{index}"')
+
+
+def partitioned_index_target(conn, statement):
+    """The CONCURRENT_INDEX_RE match when `statement` builds an index
+    concurrently on a partitioned table, else None."""
+    m = CONCURRENT_INDEX_RE.match(strip_comments(statement))
+    if not m:
+        return None
+    row = conn.execute("select relkind from pg_class where oid = to_regclass(%s)", (m.group(3),)).fetchone()
+    return m if row and row[0] == 'p' else None
+
+
+def create_partitioned_index_concurrently(conn, statement, match, lock_timeout):
+    """CREATE INDEX CONCURRENTLY on a partitioned table, which Postgres refuses:
+    create the parent index ON ONLY the table (invalid, no build), build each
+    partition's index CONCURRENTLY and attach it. The parent becomes valid
+    once every partition is attached. Writes are never blocked for a build;
+    partitions already attached are skipped, so a failed run resumes."""
+    stripped = strip_comments(statement)
+    unique = 'unique ' if match.group(1) else ''
+    index, table, rest = match.group(2).strip('"'), match.group(3), stripped[match.end():]
+    schema = conn.execute("select relnamespace::regnamespace::text from pg_class where oid = %s::regclass",
+                          (table,)).fetchone()[0]
+    parent = f'{schema}."{index}"'
+    conn.execute(f"set lock_timeout = '{lock_timeout}'")
+    conn.execute(f'create {unique}index if not exists "{index}" on only {table} {rest}')
+    partitions = conn.execute(
+        "select c.relname from pg_inherits i join pg_class c on c.oid = i.inhrelid "
+        "where i.inhparent = %s::regclass and not exists ("
+        "  select 1 from pg_inherits a join pg_index x on x.indexrelid = a.inhrelid"
+        "   where a.inhparent = %s::regclass and x.indrelid = c.oid) "
+        "order by c.relname",
+        (table, parent)
+    ).fetchall()
+    for (partition,) in partitions:
+        leaf = f"{partition}_{index}"[:63]
+        build = f'create {unique}index concurrently if not exists "{leaf}" on {schema}."{partition}" {rest}'
+        drop_invalid_index(conn, build, lock_timeout)
+        conn.execute(f"set lock_timeout = '{lock_timeout}'")
+        started = time.perf_counter()
+        conn.execute(build)
+        conn.execute(f'alter index {parent} attach partition {schema}."{leaf}"')
+        print(f"    {leaf} ({time.perf_counter() - started:.1f}s)")
+
+
+def with_lock_retries(action, retries, label):
+    """Run action(); on lock_timeout wait with backoff and try again."""
+    for attempt in range(1, retries + 1):
+        try:
+            return action()
+        except errors.LockNotAvailable:
+            if attempt == retries:
+                raise
+            delay = min(30, 2 ** attempt)
+            print(f"  {label}: lock not available (attempt {attempt}/{retries}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+def apply_migration(conn, migration, lock_timeout, retries):
+    version, name, _path, checksum, statements, transactional = migration
+    label = f"{version}_{name}"
+    if transactional:
+        def run_all():
+            with conn.transaction():
+                conn.execute(f"set local lock_timeout = '{lock_timeout}'")
+                for stmt in statements:
+                    conn.execute(stmt)
+                record(conn, version, name, checksum)
+        with_lock_retries(run_all, retries, label)
+        print(f"Applied {label} ({len(statements)} statements, 1 transaction)")
+        return
+    for idx, stmt in enumerate(statements, start=1):
+        def run_one():
+            partitioned = partitioned_index_target(conn, stmt)
+            if partitioned:
+                create_partitioned_index_concurrently(conn, stmt, partitioned, lock_timeout)
+                return
+            drop_invalid_index(conn, stmt, lock_timeout)
+            conn.execute(f"set lock_timeout = '{lock_timeout}'")
+            conn.execute(stmt)
+        started = time.perf_counter()
+        with_lock_retries(run_one, retries, f"{label} [{idx}/{len(statements)}]")
+        print(f"  [{idx}/{len(statements)}] {summarize(stmt)} ({time.perf_counter() - started:.1f}s)")
+    conn.execute("reset lock_timeout")
+    record(conn, version, name, checksum)
+    print(f"Applied {label} ({len(statements)} statements, autocommit)")
+
+
+def summarize(statement: str, width: int = 90) -> str:
+    text = ' '.join(strip_comments(statement).split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def print_plan(pending):
+    if not pending:
+        print('Nothing to apply: database is up to date.')
+        return
+    for version, name, _path, _checksum, statements, transactional in pending:
+        mode = 'single transaction' if transactional else 'autocommit, statement by statement'
+        print(f"{version}_{name} ({len(statements)} statements, {mode})")
+        for stmt in statements:
+            print(f"    {summarize(stmt)}")
 
 
 def main():
-    parser = argparse.ArgumentParser(description='Apply supabase_schema.sql to Supabase Postgres')
+    parser = argparse.ArgumentParser(description='Apply versioned migrations in ./migrations to Supabase Postgres')
     parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides env)')
+    parser.add_argument('--dry-run', '--plan', dest='dry_run', action='store_true',
+                        help='Print the pending migrations and their statements without applying them')
+    parser.add_argument('--status', action='store_true', help='List applied and pending migrations')
+    parser.add_argument('--target', help='Apply migrations up to and including this version')
+    parser.add_argument('--baseline', metavar='VERSION',
+                        help='Record migrations up to VERSION as applied without running them '
+                             '(for databases created from the old supabase_schema.sql)')
+    parser.add_argument('--lock-timeout', default=os.getenv('MIGRATION_LOCK_TIMEOUT', '5s'),
+                        help='lock_timeout for every statement (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=5, help='Attempts per statement on lock timeout')
     args = parser.parse_args()
 
-    load_dotenv(dotenv_path=Path(__file__).parent / '.env')
+    load_dotenv(dotenv_path=ROOT / '.env')
 
-    db_url = (args.db_url or os.getenv('SUPABASE_DB_URL') or '').strip()
-    if db_url:
-        db_url = db_url.strip('"').strip("'")
-        if db_url.startswith('postgres://'):
-            db_url = 'postgresql://' + db_url[len('postgres://'):]
-        if 'sslmode=' not in db_url:
-            sep = '&' if '?' in db_url else '?'
-            db_url = f"{db_url}{sep}sslmode=require"
+    db_url = normalize_db_url(args.db_url or os.getenv('SUPABASE_DB_URL') or '')
     if not db_url:
         print('ERROR: Missing database connection info.')
         print('Provide SUPABASE_DB_URL in .env or pass --db-url "postgresql://..."')
         print('Example: postgresql://postgres:<db-password>@db.<project_ref>.supabase.co:5432/postgres?sslmode=require')
         sys.exit(1)
 
-    sql_path = Path(__file__).parent / 'supabase_schema.sql'
-    if not sql_path.exists():
-        print(f'ERROR: Cannot find {sql_path}')
-        sys.exit(1)
-
-    sql = read_sql_file(sql_path)
-    statements = split_statements(sql)
-    if not statements:
-        print('No SQL statements found in supabase_schema.sql')
+    migrations = load_migrations()
+    if not migrations:
+        print(f"No migrations found in {MIGRATIONS_DIR}")
         return
 
     print('Connecting to Supabase Postgres...')
     with psycopg.connect(db_url, autocommit=True) as conn:
-        with conn.cursor() as cur:
-            for idx, stmt in enumerate(statements, start=1):
-                try:
-                    cur.execute(stmt)
-                    print(f"[{idx}/{len(statements)}] Executed")
-                except Exception as e:
-                    msg = str(e).lower()
-                    if 'already exists' in msg or 'duplicate key value' in msg:
-                        print(f"[{idx}/{len(statements)}] Skipped (exists)")
-                        continue
-                    print(f"[{idx}/{len(statements)}] ERROR: {e}")
-                    raise
+        conn.execute("select pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+        try:
+            if not (args.status or args.dry_run):
+                ensure_tracking_table(conn)
+            applied = applied_migrations(conn)
+
+            changed = [m for m in migrations if m[0] in applied and applied[m[0]][2] != m[3]]
+            for version, name, *_ in changed:
+                print(f"ERROR: {version}_{name}.sql was modified after it was applied; add a new migration instead")
+            if changed:
+                sys.exit(1)
+
+            if args.baseline:
+                for version, name, _path, checksum, _s, _t in migrations:
+                    if version <= args.baseline and version not in applied:
+                        record(conn, version, name, checksum)
+                        print(f"Baselined {version}_{name}")
+                return
+
+            pending = [m for m in migrations if m[0] not in applied and (not args.target or m[0] <= args.target)]
+            if args.status:
+                for version, name, *_ in migrations:
+                    state = f"applied {applied[version][3]:%Y-%m-%d %H:%M}" if version in applied else 'pending'
+                    print(f"{version}_{name}: {state}")
+                return
+            if not applied and pending and pending[0][0] == '0001':
+                exists = conn.execute("select to_regclass('public.sales') is not null").fetchone()[0]
+                if exists:
+                    print('[WARN] Tables already exist but no migrations are recorded. If this database was '
+                          'created from supabase_schema.sql, run with --baseline 0001 first.')
+            if args.dry_run:
+                print_plan(pending)
+                return
+            if not pending:
+                print('Nothing to apply: database is up to date.')
+                return
+            for migration in pending:
+                apply_migration(conn, migration, args.lock_timeout, args.retries)
+        finally:
+            conn.execute("select pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
 
     print('Migration completed successfully.')
 
 
 if __name__ == '__main__':
     main()
-
@@ -1,4 +1,4 @@
-﻿
+
 create extension if not exists "uuid-ossp";
 
 create table if not exists public.profiles (
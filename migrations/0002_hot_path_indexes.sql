@@ -0,0 +1,15 @@
+-- Indexes matching the ordering of the hot reads (see check_query_plans.py).
+-- Built CONCURRENTLY so sales and retailer_inventory stay writable during deploys.
+
+-- load_data: WHERE user_id = $1 ORDER BY timestamp DESC (also serves the FK cascade)
+create index concurrently if not exists idx_sales_user_timestamp on public.sales(user_id, timestamp desc);
+drop index concurrently if exists public.idx_sales_user_id;
+
+-- Retailer inventory list: WHERE retailer_id = $1 ORDER BY date_posted DESC, created_at DESC
+create index concurrently if not exists idx_ri_retailer_posted
+  on public.retailer_inventory(retailer_id, date_posted desc, created_at desc);
+
+-- Consumer browse (latest): DISTINCT ON (retailer_id, coalesce(rice_variety, '')) in this order
+create index concurrently if not exists idx_ri_retailer_variety_posted
+  on public.retailer_inventory(retailer_id, (coalesce(rice_variety, '')), date_posted desc, created_at desc);
+drop index concurrently if exists public.idx_ri_retailer;
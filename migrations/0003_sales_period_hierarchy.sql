@@ -0,0 +1,78 @@
+-- Period hierarchy for sales entries, enforced by the database instead of a
+-- full-history scan in submit_data:
+--   * at most one yearly row per (user, year) and one monthly row per
+--     (user, year, month)                        -> partial unique indexes
+--   * no monthly/weekly/daily row under an existing yearly row, and no
+--     weekly/daily row under an existing monthly row -> BEFORE trigger
+-- The trigger serializes writers per (user, year) with a transaction-level
+-- advisory lock, so two concurrent submits cannot both pass the check. Its
+-- EXISTS probes are served by the two partial indexes below.
+-- Errors carry the constraint/index name; app.py maps them to messages.
+
+-- Fail early with a readable message instead of leaving an INVALID index behind
+do $$
+declare
+  dupes text;
+begin
+  select string_agg(format('%s %s/%s (%s rows)', user_id, year, coalesce(month::text, '-'), n), ', ')
+    into dupes
+    from (
+      select user_id, year, month, count(*) as n
+        from public.sales
+       where data_level = 'monthly'
+       group by user_id, year, month
+      having count(*) > 1
+      union all
+      select user_id, year, null, count(*)
+        from public.sales
+       where data_level = 'yearly'
+       group by user_id, year
+      having count(*) > 1
+    ) d;
+  if dupes is not null then
+    raise exception 'Duplicate yearly/monthly sales entries must be removed before this migration: %', dupes;
+  end if;
+end
+$$;
+
+create unique index concurrently if not exists uq_sales_yearly
+  on public.sales(user_id, year) where data_level = 'yearly';
+
+create unique index concurrently if not exists uq_sales_monthly
+  on public.sales(user_id, year, month) where data_level = 'monthly';
+
+create or replace function public.sales_check_period_hierarchy() returns trigger
+language plpgsql as $$
+begin
+  if new.year is null then
+    return new;
+  end if;
+  -- Every level takes the lock (a yearly insert must not race a monthly one);
+  -- key space 7272 keeps these apart from the migration runner's lock
+  perform pg_advisory_xact_lock(7272, hashtext(new.user_id::text || ':' || new.year));
+  if new.data_level = 'yearly' then
+    return new;
+  end if;
+  if exists (
+    select 1 from public.sales
+     where user_id = new.user_id and year = new.year and data_level = 'yearly' and id <> new.id
+  ) then
+    raise exception 'Year % already has a yearly entry', new.year
+      using errcode = 'check_violation', constraint = 'sales_period_under_yearly';
+  end if;
+  if new.data_level in ('weekly', 'daily') and exists (
+    select 1 from public.sales
+     where user_id = new.user_id and year = new.year and month = new.month
+       and data_level = 'monthly' and id <> new.id
+  ) then
+    raise exception '%-% already has a monthly entry', new.year, lpad(new.month::text, 2, '0')
+      using errcode = 'check_violation', constraint = 'sales_period_under_monthly';
+  end if;
+  return new;
+end
+$$;
+
+drop trigger if exists sales_period_hierarchy on public.sales;
+create trigger sales_period_hierarchy
+  before insert or update of user_id, year, month, data_level on public.sales
+  for each row execute function public.sales_check_period_hierarchy();
@@ -0,0 +1,129 @@
+-- Per-user summary of the sales history, so /api/available-years,
+-- /api/defaults and /api/predict read one row instead of the whole history.
+--   years      {"2024": 123, ...}  rows per (non-zero) year
+--   latest     market-analysis fields of the latest row (by timestamp) under
+--              "all", "y:<year>", "m:<month>" and "ym:<year>-<month>"
+--   stats      {"count", "sum_waste", "sum_price", "sum_sold",
+--               "by_month": {"<month>": {"count", "sum_sold", "sum_waste", "sum_price"}}}
+--              with NULL measures counted as 0, as generate_ai_recommendations does
+-- Rebuilt per affected user by statement-level triggers on every sales write
+-- (one refresh per user per statement, so COPY loads stay cheap).
+
+create table if not exists public.user_data_catalog (
+  user_id uuid primary key references public.profiles(id) on delete cascade,
+  row_count int not null default 0,
+  years jsonb not null default '{}'::jsonb,
+  latest jsonb not null default '{}'::jsonb,
+  stats jsonb not null default '{}'::jsonb,
+  updated_at timestamptz not null default now()
+);
+
+create or replace function public.refresh_user_data_catalog(p_user uuid) returns void
+language plpgsql as $$
+begin
+  -- Serialize refreshes per user: the second writer waits and then sees the
+  -- first one's committed rows, so the catalog never misses a write
+  perform pg_advisory_xact_lock(7273, hashtext(p_user::text));
+  -- The profile is gone when this runs from its ON DELETE CASCADE
+  if not exists (select 1 from public.profiles where id = p_user) then
+    delete from public.user_data_catalog where user_id = p_user;
+    return;
+  end if;
+  insert into public.user_data_catalog (user_id, row_count, years, latest, stats, updated_at)
+  with s as (
+    select id, timestamp, year, month,
+           jsonb_build_object(
+             'population', population, 'avg_consumption', avg_consumption,
+             'purchasing_power', purchasing_power, 'competitors', competitors,
+             'customer_demand', customer_demand
+           ) as fields,
+           coalesce(waste_percentage, 0) as waste,
+           coalesce(price_per_kg, 0) as price,
+           coalesce(rice_sold, 0) as sold,
+           -- Month for seasonal averages: month, else parsed from week_date (YYYY-MM, YYYY-MM-DD, YYYY-MM-Wnn)
+           case when coalesce(year, 0) <> 0 and coalesce(month, 0) <> 0 then month
+                else substring(week_date from '^\s*\d{4}-(\d{1,2})(?:-\d{1,2}|-W\d+)?\s*$')::int
+           end as season_month
+      from public.sales
+     where user_id = p_user
+  ),
+  latest as (
+    select distinct on (k) k, fields
+      from (
+        select 'all' as k, fields, timestamp, id from s
+        union all
+        select 'y:' || year, fields, timestamp, id from s where year is not null
+        union all
+        select 'm:' || month, fields, timestamp, id from s where month is not null
+        union all
+        select 'ym:' || year || '-' || month, fields, timestamp, id from s where year is not null and month is not null
+      ) keyed
+     order by k, timestamp desc, id
+  ),
+  by_month as (
+    select season_month, count(*) as n, sum(sold) as sum_sold, sum(waste) as sum_waste, sum(price) as sum_price
+      from s
+     where season_month is not null
+     group by season_month
+  )
+  select p_user,
+         (select count(*) from s),
+         coalesce((select jsonb_object_agg(year::text, n)
+                     from (select year, count(*) as n from s where coalesce(year, 0) <> 0 group by year) y), '{}'::jsonb),
+         coalesce((select jsonb_object_agg(k, fields) from latest), '{}'::jsonb),
+         jsonb_build_object(
+           'count', (select count(*) from s),
+           'sum_waste', (select coalesce(sum(waste), 0) from s),
+           'sum_price', (select coalesce(sum(price), 0) from s),
+           'sum_sold', (select coalesce(sum(sold), 0) from s),
+           'by_month', coalesce((select jsonb_object_agg(season_month::text, jsonb_build_object(
+                          'count', n, 'sum_sold', sum_sold, 'sum_waste', sum_waste, 'sum_price', sum_price))
+                                   from by_month), '{}'::jsonb)
+         ),
+         now()
+  on conflict (user_id) do update
+     set row_count = excluded.row_count, years = excluded.years, latest = excluded.latest,
+         stats = excluded.stats, updated_at = excluded.updated_at;
+end
+$$;
+
+create or replace function public.sales_refresh_user_data_catalog() returns trigger
+language plpgsql as $$
+declare
+  uid uuid;
+begin
+  if tg_op = 'INSERT' then
+    for uid in select distinct user_id from new_rows loop
+      perform public.refresh_user_data_catalog(uid);
+    end loop;
+  elsif tg_op = 'DELETE' then
+    for uid in select distinct user_id from old_rows loop
+      perform public.refresh_user_data_catalog(uid);
+    end loop;
+  else
+    for uid in select user_id from new_rows union select user_id from old_rows loop
+      perform public.refresh_user_data_catalog(uid);
+    end loop;
+  end if;
+  return null;
+end
+$$;
+
+drop trigger if exists sales_catalog_insert on public.sales;
+create trigger sales_catalog_insert
+  after insert on public.sales referencing new table as new_rows
+  for each statement execute function public.sales_refresh_user_data_catalog();
+
+drop trigger if exists sales_catalog_update on public.sales;
+create trigger sales_catalog_update
+  after update on public.sales referencing old table as old_rows new table as new_rows
+  for each statement execute function public.sales_refresh_user_data_catalog();
+
+drop trigger if exists sales_catalog_delete on public.sales;
+create trigger sales_catalog_delete
+  after delete on public.sales referencing old table as old_rows
+  for each statement execute function public.sales_refresh_user_data_catalog();
+
+-- Backfill
+select public.refresh_user_data_catalog(id) from public.profiles
+ where exists (select 1 from public.sales where sales.user_id = profiles.id);
@@ -0,0 +1,153 @@
+-- Anonymized cross-retailer benchmarks for /api/market-benchmark.
+-- market_retailer_metrics() reduces each retailer's recent sales to three
+-- numbers (waste %, average price, kg sold per day) plus the market segment
+-- it belongs to. refresh_market_benchmarks() turns those into percentile
+-- distributions per segment with GROUPING SETS and stores them in
+-- market_benchmarks; segments with fewer than p_min_retailers retailers are
+-- left out, so no published figure describes a single store. The endpoint
+-- only computes the caller's own metrics at request time and reads the
+-- stored distributions; other retailers' rows are only read by the refresh.
+
+-- Days covered by one sales row, for normalizing volume across data levels.
+-- NULL for rows whose year/month/week cannot form a date.
+create or replace function public.sales_days_covered(p_level text, p_year int, p_month int, p_week int)
+returns int
+language sql immutable as $$
+  select case
+           when p_year is null or p_year not between 1 and 9999 then null
+           when p_level = 'yearly' then make_date(p_year + 1, 1, 1) - make_date(p_year, 1, 1)
+           when p_month is null or p_month not between 1 and 12 then null
+           when p_level = 'daily' then 1
+           when p_level = 'monthly' then extract(day from make_date(p_year, p_month, 1) + interval '1 month - 1 day')::int
+           when p_level = 'weekly' and p_week between 1 and 5 then greatest(1, least(p_week * 7,
+                  extract(day from make_date(p_year, p_month, 1) + interval '1 month - 1 day')::int) - (p_week - 1) * 7)
+         end
+$$;
+
+-- One row per retailer (or only p_user) over periods ending in the last p_months months
+create or replace function public.market_retailer_metrics(p_months int default 12, p_user uuid default null)
+returns table (
+  user_id uuid,
+  area text,
+  population_band text,
+  competitor_band text,
+  entries bigint,
+  waste_percentage numeric,
+  price_per_kg numeric,
+  kg_per_day numeric
+)
+language sql stable as $$
+  with s as (
+    select s.user_id, s.timestamp, s.population, s.competitors, s.rice_sold, s.rice_unsold, s.price_per_kg,
+           public.sales_days_covered(s.data_level, s.year, s.month, s.week) as days,
+           -- Guarded so make_date never sees an invalid month, whatever order the quals run in
+           case when s.year not between 1 and 9999 then null
+                when s.data_level = 'yearly' then make_date(s.year + 1, 1, 1)
+                when s.month between 1 and 12 then (make_date(s.year, s.month, 1) + interval '1 month')::date
+           end as period_end
+      from public.sales s
+     where (p_user is null or s.user_id = p_user)
+  ),
+  r as (
+    select s.user_id,
+           count(*) as entries,
+           sum(coalesce(s.rice_sold, 0)) as sold,
+           sum(coalesce(s.rice_unsold, 0)) as unsold,
+           avg(s.price_per_kg) filter (where s.price_per_kg > 0) as price,
+           sum(s.days) as days,
+           (array_agg(s.population order by s.period_end desc, s.timestamp desc)
+              filter (where s.population is not null))[1] as population,
+           (array_agg(s.competitors order by s.period_end desc, s.timestamp desc)
+              filter (where s.competitors is not null))[1] as competitors
+      from s
+     where s.days is not null
+       and s.period_end > (current_date - make_interval(months => p_months))
+     group by s.user_id
+  )
+  select r.user_id,
+         coalesce(nullif(trim(p.retailer_area), ''), 'Unspecified'),
+         -- Same bands as calculate_market_comparison() in app.py
+         case when r.population is null then null
+              when r.population < 1000 then 'Small Market (<1000)'
+              when r.population < 2000 then 'Medium Market (1000-2000)'
+              else 'Large Market (>2000)'
+         end,
+         case when r.competitors is null then null
+              when r.competitors <= 2 then '0-2 competitors'
+              when r.competitors <= 5 then '3-5 competitors'
+              else '6+ competitors'
+         end,
+         r.entries,
+         case when r.sold + r.unsold > 0 then round(r.unsold / (r.sold + r.unsold) * 100, 4) end,
+         round(r.price, 4),
+         case when r.days > 0 then round(r.sold / r.days, 4) end
+    from r
+    join public.profiles p on p.id = r.user_id
+   where p.role = 'retailer'
+$$;
+
+create table if not exists public.market_benchmarks (
+  segment_type text not null,          -- all | population | area | competitors
+  segment text not null,
+  metric text not null,                -- waste_percentage | price_per_kg | kg_per_day
+  retailers int not null,
+  mean numeric,
+  quantiles numeric[] not null,        -- p5, p10, ..., p95
+  window_months int not null,
+  refreshed_at timestamptz not null default now(),
+  primary key (segment_type, segment, metric)
+);
+
+-- Returns the number of rows written, or -1 when another refresh is running
+create or replace function public.refresh_market_benchmarks(p_min_retailers int default 10, p_months int default 12)
+returns int
+language plpgsql as $$
+declare
+  written int;
+begin
+  if not pg_try_advisory_xact_lock(7274, 0) then
+    return -1;
+  end if;
+  delete from public.market_benchmarks;
+  insert into public.market_benchmarks (segment_type, segment, metric, retailers, mean, quantiles, window_months, refreshed_at)
+  select case when grouping(m.population_band) = 0 then 'population'
+              when grouping(m.area) = 0 then 'area'
+              when grouping(m.competitor_band) = 0 then 'competitors'
+              else 'all'
+         end,
+         coalesce(m.population_band, m.area, m.competitor_band, 'All retailers'),
+         v.metric,
+         count(*),
+         round(avg(v.value), 4),
+         percentile_cont(array[0.05, 0.10, 0.15, 0.20, 0.25, 0.30, 0.35, 0.40, 0.45, 0.50,
+                               0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90, 0.95])
+           within group (order by v.value),
+         p_months,
+         now()
+    from public.market_retailer_metrics(p_months) m
+    cross join lateral (values ('waste_percentage', m.waste_percentage),
+                               ('price_per_kg', m.price_per_kg),
+                               ('kg_per_day', m.kg_per_day)) as v(metric, value)
+   where v.value is not null
+   group by v.metric, grouping sets ((), (m.population_band), (m.area), (m.competitor_band))
+  -- A NULL band is "unknown", not a segment
+  having (grouping(m.population_band) = 1 or m.population_band is not null)
+     and (grouping(m.competitor_band) = 1 or m.competitor_band is not null)
+     and count(*) >= greatest(p_min_retailers, 2);
+  get diagnostics written = row_count;
+  return written;
+end
+$$;
+
+-- Hourly refresh where pg_cron is available (Supabase); otherwise app.py
+-- refreshes in the background when the stored figures get stale
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule('refresh-market-benchmarks', '17 * * * *',
+                          'select public.refresh_market_benchmarks()');
+  end if;
+end
+$$;
+
+select public.refresh_market_benchmarks();
@@ -0,0 +1,182 @@
+-- Online waste-anomaly scoring for new sales rows.
+-- Per user, sales_waste_state keeps an exponentially weighted mean/variance
+-- of waste_percentage (recent entries count most) and sales_waste_seasonal
+-- keeps a running mean/variance per calendar month (Welford). Each inserted
+-- row is scored against the state as it was before the row, in O(1), and
+-- then folded into it:
+--   waste_zscore    (waste - mean) / std, seasonal baseline when that month
+--                   has enough history, else the EWMA; NULL while warming up
+--   waste_anomaly   'high' (z >= 3), 'elevated' (z >= 2), 'low' (z <= -3),
+--                   'normal', or NULL when not scored
+--   waste_baseline  'seasonal' or 'ewma'
+-- Updates and deletes do not rewind the state; rebuild_sales_waste_state()
+-- replays a user's history when that matters (and after bulk loads that
+-- bypass triggers).
+
+alter table public.sales add column if not exists waste_zscore numeric;
+alter table public.sales add column if not exists waste_anomaly text;
+alter table public.sales add column if not exists waste_baseline text;
+
+create table if not exists public.sales_waste_state (
+  user_id uuid primary key references public.profiles(id) on delete cascade,
+  n int not null default 0,
+  mean double precision not null default 0,
+  var double precision not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists public.sales_waste_seasonal (
+  user_id uuid not null references public.profiles(id) on delete cascade,
+  month smallint not null check (month between 1 and 12),
+  n int not null default 0,
+  mean double precision not null default 0,
+  m2 double precision not null default 0,
+  primary key (user_id, month)
+);
+
+-- Score one observation against the user's state, then update the state
+create or replace function public.sales_waste_observe(
+  p_user uuid, p_month int, p_value double precision,
+  out zscore numeric, out anomaly text, out baseline text
+)
+language plpgsql as $$
+declare
+  -- EWMA weight of the newest entry (~ the last 20 entries dominate)
+  alpha constant double precision := 0.1;
+  -- Entries needed before a baseline is trusted
+  min_ewma constant int := 8;
+  min_seasonal constant int := 4;
+  -- Floor for the standard deviation, in percentage points, so a retailer
+  -- with near-constant waste is not flagged for a 0.5 point wobble
+  min_std constant double precision := 1.0;
+  st public.sales_waste_state%rowtype;
+  se public.sales_waste_seasonal%rowtype;
+  z double precision;
+  diff double precision;
+  incr double precision;
+begin
+  insert into public.sales_waste_state (user_id) values (p_user) on conflict (user_id) do nothing;
+  -- Row lock: concurrent inserts for one user are scored one after the other
+  select * into st from public.sales_waste_state where user_id = p_user for update;
+  if p_month between 1 and 12 then
+    insert into public.sales_waste_seasonal (user_id, month) values (p_user, p_month)
+      on conflict (user_id, month) do nothing;
+    select * into se from public.sales_waste_seasonal where user_id = p_user and month = p_month for update;
+  end if;
+
+  if se.n >= min_seasonal then
+    z := (p_value - se.mean) / greatest(sqrt(se.m2 / (se.n - 1)), min_std);
+    baseline := 'seasonal';
+  elsif st.n >= min_ewma then
+    z := (p_value - st.mean) / greatest(sqrt(st.var), min_std);
+    baseline := 'ewma';
+  end if;
+  if z is not null then
+    zscore := round(z::numeric, 3);
+    anomaly := case when z >= 3 then 'high' when z >= 2 then 'elevated' when z <= -3 then 'low' else 'normal' end;
+  end if;
+
+  -- EWMA mean/variance (West 1979); the first entry just seeds the mean
+  if st.n = 0 then
+    st.mean := p_value;
+    st.var := 0;
+  else
+    diff := p_value - st.mean;
+    incr := alpha * diff;
+    st.mean := st.mean + incr;
+    st.var := (1 - alpha) * (st.var + diff * incr);
+  end if;
+  update public.sales_waste_state
+     set n = st.n + 1, mean = st.mean, var = st.var, updated_at = now()
+   where user_id = p_user;
+
+  if se.user_id is not null then
+    diff := p_value - se.mean;
+    se.mean := se.mean + diff / (se.n + 1);
+    update public.sales_waste_seasonal
+       set n = se.n + 1, mean = se.mean, m2 = se.m2 + diff * (p_value - se.mean)
+     where user_id = p_user and month = p_month;
+  end if;
+end
+$$;
+
+-- Calendar month of a row: month, else parsed from week_date (as in user_data_catalog)
+create or replace function public.sales_season_month(p_year int, p_month int, p_week_date text)
+returns int
+language sql immutable as $$
+  select case when coalesce(p_year, 0) <> 0 and coalesce(p_month, 0) <> 0 then p_month
+              else substring(p_week_date from '^\s*\d{4}-(\d{1,2})(?:-\d{1,2}|-W\d+)?\s*$')::int
+         end
+$$;
+
+create or replace function public.sales_score_waste() returns trigger
+language plpgsql as $$
+declare
+  r record;
+begin
+  if new.waste_percentage is null then
+    return new;
+  end if;
+  r := public.sales_waste_observe(new.user_id, public.sales_season_month(new.year, new.month, new.week_date),
+                                  new.waste_percentage::double precision);
+  new.waste_zscore := r.zscore;
+  new.waste_anomaly := r.anomaly;
+  new.waste_baseline := r.baseline;
+  return new;
+end
+$$;
+
+drop trigger if exists sales_waste_anomaly on public.sales;
+create trigger sales_waste_anomaly
+  before insert on public.sales
+  for each row execute function public.sales_score_waste();
+
+-- Reset a user's state and replay their rows in insertion order, rewriting
+-- the scores with a single UPDATE
+create or replace function public.rebuild_sales_waste_state(p_user uuid) returns int
+language plpgsql as $$
+declare
+  row_ids uuid[] := '{}';
+  zs numeric[] := '{}';
+  labels text[] := '{}';
+  bases text[] := '{}';
+  s record;
+  r record;
+begin
+  delete from public.sales_waste_state where user_id = p_user;
+  delete from public.sales_waste_seasonal where user_id = p_user;
+  for s in
+    select id, year, month, week_date, waste_percentage
+      from public.sales
+     where user_id = p_user
+     order by timestamp, id
+  loop
+    row_ids := row_ids || s.id;
+    if s.waste_percentage is null then
+      zs := zs || null::numeric;
+      labels := labels || null::text;
+      bases := bases || null::text;
+      continue;
+    end if;
+    r := public.sales_waste_observe(p_user, public.sales_season_month(s.year, s.month, s.week_date),
+                                    s.waste_percentage::double precision);
+    zs := zs || r.zscore;
+    labels := labels || r.anomaly;
+    bases := bases || r.baseline;
+  end loop;
+  update public.sales t
+     set waste_zscore = u.z, waste_anomaly = u.label, waste_baseline = u.base
+    from unnest(row_ids, zs, labels, bases) as u(id, z, label, base)
+   where t.id = u.id
+     and (t.waste_zscore, t.waste_anomaly, t.waste_baseline) is distinct from (u.z, u.label, u.base);
+  return coalesce(array_length(row_ids, 1), 0);
+end
+$$;
+
+-- Backfill existing history
+select public.rebuild_sales_waste_state(id) from public.profiles
+ where exists (select 1 from public.sales where sales.user_id = profiles.id);
+
+-- /api/anomalies: a user's flagged rows, newest first
+create index concurrently if not exists idx_sales_waste_anomalies
+  on public.sales(user_id, timestamp desc) where waste_anomaly <> 'normal';
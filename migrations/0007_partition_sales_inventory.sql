@@ -0,0 +1,461 @@
+-- Range partitioning for the two tables that grow without bound:
+--   sales               by year            (sales_y2025, ..., sales_default)
+--   retailer_inventory  by date_posted month (retailer_inventory_p202510, ..., retailer_inventory_default)
+-- Primary keys become (id, year) / (id, date_posted) because a partitioned
+-- table's unique keys must contain the partition key.
+--
+-- Online: the tables stay writable while rows are copied. The migration
+-- runs statement by statement (the CALLs commit per batch):
+--   1. prepare   create sales_partitioned / retailer_inventory_partitioned
+--                with their partitions, keys and indexes, and an AFTER ROW
+--                trigger on the old table that mirrors every insert, update
+--                and delete into the new one. Installing the trigger waits
+--                for in-flight writes, then holds its lock for milliseconds.
+--   2. backfill  copy_to_partitioned() copies the old rows in id order,
+--                5,000 per committed batch. Each batch reads its rows FOR
+--                SHARE, so it copies the latest committed version and skips
+--                deleted rows; updates to those rows wait for that batch only.
+--   3. swap      one short transaction per table: ACCESS EXCLUSIVE on the
+--                old and new table, drop the old table, rename the new one
+--                and its indexes, create the triggers. Catalog changes only,
+--                so writes wait well under a second (plus lock_timeout
+--                retries if a long transaction holds the table).
+-- Each step checks what is already done, so a failed run can be resumed.
+--
+-- maintain_partitions() creates upcoming partitions and applies the
+-- retention policy in partition_policy: inventory months older than
+-- retention_months are detached and moved to the inventory_archive schema
+-- (a catalog change, no row-by-row DELETE), where inventory_archive.py can
+-- export them. It runs daily through pg_cron where available, or through
+-- `python partition_maintenance.py` from any scheduler.
+
+-- Partition keys must be NOT NULL for the new primary key. The NOT VALID
+-- check stops new NULL years while the old table is still written to.
+do $$
+declare
+  n bigint;
+begin
+  if (select relkind from pg_class where oid = 'public.sales'::regclass) <> 'r' then
+    return;
+  end if;
+  if not exists (select 1 from pg_constraint where conrelid = 'public.sales'::regclass and conname = 'sales_year_not_null') then
+    alter table public.sales add constraint sales_year_not_null check (year is not null) not valid;
+  end if;
+  select count(*) into n from public.sales where year is null;
+  if n > 0 then
+    raise exception '% sales rows have no year; fix or delete them before this migration', n;
+  end if;
+end
+$$;
+
+-- Create partition p_name of p_parent for [p_from, p_to) unless it exists.
+-- Rows already sitting in the parent's default partition for that range are
+-- moved into it first, since ATTACH refuses while the default overlaps.
+create or replace function public.ensure_range_partition(p_parent text, p_key text, p_name text, p_from text, p_to text)
+returns boolean
+language plpgsql as $$
+begin
+  if to_regclass(format('public.%I', p_name)) is not null then
+    return false;
+  end if;
+  execute format('create table public.%I (like public.%I including defaults including constraints)', p_name, p_parent);
+  if to_regclass(format('public.%I', p_parent || '_default')) is not null then
+    execute format('with moved as (delete from public.%I where %I >= %L and %I < %L returning *) '
+                   'insert into public.%I select * from moved',
+                   p_parent || '_default', p_key, p_from, p_key, p_to, p_name);
+  end if;
+  execute format('alter table public.%I attach partition public.%I for values from (%L) to (%L)',
+                 p_parent, p_name, p_from, p_to);
+  return true;
+end
+$$;
+
+create or replace function public.ensure_sales_partitions(p_from_year int, p_to_year int)
+returns int
+language plpgsql as $$
+declare
+  y int;
+  created int := 0;
+begin
+  for y in p_from_year .. p_to_year loop
+    if public.ensure_range_partition('sales', 'year', 'sales_y' || y, y::text, (y + 1)::text) then
+      created := created + 1;
+    end if;
+  end loop;
+  return created;
+end
+$$;
+
+create or replace function public.ensure_inventory_partitions(p_from date, p_to date)
+returns int
+language plpgsql as $$
+declare
+  m date;
+  created int := 0;
+begin
+  for m in select generate_series(date_trunc('month', p_from), date_trunc('month', p_to), interval '1 month')::date loop
+    if public.ensure_range_partition('retailer_inventory', 'date_posted', 'retailer_inventory_p' || to_char(m, 'YYYYMM'),
+                                     m::text, (m + interval '1 month')::date::text) then
+      created := created + 1;
+    end if;
+  end loop;
+  return created;
+end
+$$;
+
+
+-- Mirror one row change on the old table into the partitioned copy named by
+-- the trigger argument (step 1); dropped with the old table at the swap
+create or replace function public.mirror_to_partitioned() returns trigger
+language plpgsql as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    execute format('delete from public.%I where id = $1', tg_argv[0]) using old.id;
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    execute format('insert into public.%I select ($1).*', tg_argv[0]) using new;
+  end if;
+  return null;
+end
+$$;
+
+-- Copy p_source into p_target in id order, committing every p_batch rows
+-- (step 2). Rows the mirror trigger already wrote are skipped.
+create or replace procedure public.copy_to_partitioned(p_source text, p_target text, p_batch int default 5000)
+language plpgsql as $$
+declare
+  last_id uuid;
+  n int;
+  total bigint := 0;
+begin
+  if to_regclass(format('public.%I', p_target)) is null then
+    return;
+  end if;
+  loop
+    execute format(
+      'with batch as (select * from public.%I where $1 is null or id > $1 order by id limit $2 for share), '
+      '     copied as (insert into public.%I select * from batch on conflict do nothing) '
+      'select count(*), (select id from batch order by id desc limit 1) from batch',
+      p_source, p_target) into n, last_id using last_id, p_batch;
+    total := total + n;
+    commit;
+    exit when n < p_batch;
+  end loop;
+  raise notice 'copied % rows from % into %', total, p_source, p_target;
+  execute format('analyze public.%I', p_target);
+end
+$$;
+
+-- sales --------------------------------------------------------------------
+
+do $$
+declare
+  y int;
+begin
+  if to_regclass('public.sales_partitioned') is not null
+     or (select relkind from pg_class where oid = 'public.sales'::regclass) <> 'r' then
+    return;
+  end if;
+  create table public.sales_partitioned (like public.sales including defaults including constraints)
+    partition by range (year);
+  alter table public.sales_partitioned drop constraint if exists sales_year_not_null;
+  alter table public.sales_partitioned alter column year set not null;
+  create table public.sales_default partition of public.sales_partitioned default;
+
+  -- One partition per year with data (typos far outside the window stay in
+  -- the default partition), plus the coming years
+  for y in
+    select generate_series(
+      least(coalesce((select min(year) from public.sales
+                       where year >= extract(year from current_date)::int - 25), extract(year from current_date)::int),
+            extract(year from current_date)::int),
+      greatest(coalesce((select max(year) from public.sales
+                          where year <= extract(year from current_date)::int + 5), 0),
+               extract(year from current_date)::int + 1))
+  loop
+    perform public.ensure_range_partition('sales_partitioned', 'year', 'sales_y' || y, y::text, (y + 1)::text);
+  end loop;
+
+  -- The old table still owns the final index names; the swap renames these
+  alter table public.sales_partitioned add constraint sales_partitioned_pkey primary key (id, year);
+  alter table public.sales_partitioned
+    add constraint sales_user_id_fkey foreign key (user_id) references public.profiles(id) on delete cascade;
+  create index idx_sales_user_timestamp_part on public.sales_partitioned(user_id, timestamp desc);
+  -- /api/progress and the period-hierarchy trigger: one user's rows for a year
+  create index idx_sales_user_year_month_part on public.sales_partitioned(user_id, year, month);
+  create unique index uq_sales_yearly_part on public.sales_partitioned(user_id, year) where data_level = 'yearly';
+  create unique index uq_sales_monthly_part on public.sales_partitioned(user_id, year, month) where data_level = 'monthly';
+  create index idx_sales_waste_anomalies_part on public.sales_partitioned(user_id, timestamp desc)
+    where waste_anomaly <> 'normal';
+
+  create trigger sales_mirror_to_partitioned
+    after insert or update or delete on public.sales
+    for each row execute function public.mirror_to_partitioned('sales_partitioned');
+end
+$$;
+
+call public.copy_to_partitioned('sales', 'sales_partitioned');
+
+do $$
+begin
+  if to_regclass('public.sales_partitioned') is null then
+    return;
+  end if;
+  lock table public.sales, public.sales_partitioned in access exclusive mode;
+  drop table public.sales;
+  alter table public.sales_partitioned rename to sales;
+  alter table public.sales rename constraint sales_partitioned_pkey to sales_pkey;
+  alter index public.idx_sales_user_timestamp_part rename to idx_sales_user_timestamp;
+  alter index public.idx_sales_user_year_month_part rename to idx_sales_user_year_month;
+  alter index public.uq_sales_yearly_part rename to uq_sales_yearly;
+  alter index public.uq_sales_monthly_part rename to uq_sales_monthly;
+  alter index public.idx_sales_waste_anomalies_part rename to idx_sales_waste_anomalies;
+
+  create trigger sales_period_hierarchy
+    before insert or update of user_id, year, month, data_level on public.sales
+    for each row execute function public.sales_check_period_hierarchy();
+  create trigger sales_waste_anomaly
+    before insert on public.sales
+    for each row execute function public.sales_score_waste();
+  create trigger sales_catalog_insert
+    after insert on public.sales referencing new table as new_rows
+    for each statement execute function public.sales_refresh_user_data_catalog();
+  create trigger sales_catalog_update
+    after update on public.sales referencing old table as old_rows new table as new_rows
+    for each statement execute function public.sales_refresh_user_data_catalog();
+  create trigger sales_catalog_delete
+    after delete on public.sales referencing old table as old_rows
+    for each statement execute function public.sales_refresh_user_data_catalog();
+end
+$$;
+
+-- retailer_inventory -------------------------------------------------------
+
+do $$
+declare
+  m date;
+begin
+  if to_regclass('public.retailer_inventory_partitioned') is not null
+     or (select relkind from pg_class where oid = 'public.retailer_inventory'::regclass) <> 'r' then
+    return;
+  end if;
+  create table public.retailer_inventory_partitioned (like public.retailer_inventory including defaults including constraints)
+    partition by range (date_posted);
+  create table public.retailer_inventory_default partition of public.retailer_inventory_partitioned default;
+
+  for m in
+    select generate_series(
+      date_trunc('month', least(coalesce((select min(date_posted) from public.retailer_inventory
+                                           where date_posted >= current_date - interval '10 years'), current_date),
+                                current_date)),
+      date_trunc('month', greatest(coalesce((select max(date_posted) from public.retailer_inventory
+                                              where date_posted <= current_date + interval '1 year'), current_date),
+                                   (current_date + interval '3 months')::date)),
+      interval '1 month')::date
+  loop
+    perform public.ensure_range_partition('retailer_inventory_partitioned', 'date_posted',
+                                          'retailer_inventory_p' || to_char(m, 'YYYYMM'),
+                                          m::text, (m + interval '1 month')::date::text);
+  end loop;
+
+  alter table public.retailer_inventory_partitioned
+    add constraint retailer_inventory_partitioned_pkey primary key (id, date_posted);
+  alter table public.retailer_inventory_partitioned
+    add constraint retailer_inventory_retailer_id_fkey foreign key (retailer_id) references public.profiles(id) on delete cascade;
+  create index idx_ri_date_part on public.retailer_inventory_partitioned(date_posted);
+  create index idx_ri_retailer_posted_part
+    on public.retailer_inventory_partitioned(retailer_id, date_posted desc, created_at desc);
+  create index idx_ri_retailer_variety_posted_part
+    on public.retailer_inventory_partitioned(retailer_id, (coalesce(rice_variety, '')), date_posted desc, created_at desc);
+
+  create trigger retailer_inventory_mirror_to_partitioned
+    after insert or update or delete on public.retailer_inventory
+    for each row execute function public.mirror_to_partitioned('retailer_inventory_partitioned');
+end
+$$;
+
+call public.copy_to_partitioned('retailer_inventory', 'retailer_inventory_partitioned');
+
+do $$
+begin
+  if to_regclass('public.retailer_inventory_partitioned') is null then
+    return;
+  end if;
+  lock table public.retailer_inventory, public.retailer_inventory_partitioned in access exclusive mode;
+  drop table public.retailer_inventory;
+  alter table public.retailer_inventory_partitioned rename to retailer_inventory;
+  alter table public.retailer_inventory rename constraint retailer_inventory_partitioned_pkey to retailer_inventory_pkey;
+  alter index public.idx_ri_date_part rename to idx_ri_date;
+  alter index public.idx_ri_retailer_posted_part rename to idx_ri_retailer_posted;
+  alter index public.idx_ri_retailer_variety_posted_part rename to idx_ri_retailer_variety_posted;
+end
+$$;
+
+drop procedure if exists public.copy_to_partitioned(text, text, int);
+drop function if exists public.mirror_to_partitioned();
+
+-- Maintenance ----------------------------------------------------------------
+
+create schema if not exists inventory_archive;
+
+create table if not exists public.partition_policy (
+  parent text primary key check (parent in ('sales', 'retailer_inventory')),
+  premake int not null default 2,         -- future partitions kept ready (years / months)
+  retention_months int,                   -- NULL keeps everything
+  updated_at timestamptz not null default now()
+);
+insert into public.partition_policy (parent, premake, retention_months) values
+  ('sales', 2, null),
+  ('retailer_inventory', 3, 24)
+on conflict (parent) do nothing;
+
+create or replace function public.maintain_partitions()
+returns table (action text, partition_name text)
+language plpgsql as $$
+declare
+  pol public.partition_policy%rowtype;
+  cutoff date;
+  y int;
+  m date;
+  part record;
+begin
+  -- One maintenance run at a time (pg_cron and the CLI may overlap)
+  perform pg_advisory_xact_lock(7275, 0);
+
+  -- Upcoming years, plus any year that collected rows in the default
+  -- partition (e.g. a bulk load of older history)
+  select * into pol from public.partition_policy where parent = 'sales';
+  if found then
+    for y in
+      select generate_series(extract(year from current_date)::int, extract(year from current_date)::int + pol.premake)
+      union
+      select distinct year from public.sales_default
+       where year between extract(year from current_date)::int - 25 and extract(year from current_date)::int + 5
+      order by 1
+    loop
+      if public.ensure_range_partition('sales', 'year', 'sales_y' || y, y::text, (y + 1)::text) then
+        action := 'created'; partition_name := 'sales_y' || y; return next;
+      end if;
+    end loop;
+  end if;
+
+  select * into pol from public.partition_policy where parent = 'retailer_inventory';
+  if not found then
+    return;
+  end if;
+  -- Upcoming months, plus months that collected rows in the default
+  -- partition; old ones are archived right below
+  for m in
+    select generate_series(date_trunc('month', current_date),
+                           date_trunc('month', current_date) + make_interval(months => pol.premake),
+                           interval '1 month')::date
+    union
+    select distinct date_trunc('month', date_posted)::date from public.retailer_inventory_default
+     where date_posted between current_date - interval '10 years' and current_date + interval '1 year'
+    order by 1
+  loop
+    if public.ensure_range_partition('retailer_inventory', 'date_posted', 'retailer_inventory_p' || to_char(m, 'YYYYMM'),
+                                     m::text, (m + interval '1 month')::date::text) then
+      action := 'created'; partition_name := 'retailer_inventory_p' || to_char(m, 'YYYYMM'); return next;
+    end if;
+  end loop;
+
+  if pol.retention_months is null then
+    return;
+  end if;
+  cutoff := (date_trunc('month', current_date) - make_interval(months => pol.retention_months))::date;
+  for part in
+    select c.relname
+      from pg_inherits i
+      join pg_class c on c.oid = i.inhrelid
+     where i.inhparent = 'public.retailer_inventory'::regclass
+       and c.relname ~ '^retailer_inventory_p\d{6}$'
+       and to_date(substring(c.relname from '\d{6}$'), 'YYYYMM') + interval '1 month' <= cutoff
+     order by c.relname
+  loop
+    execute format('alter table public.retailer_inventory detach partition public.%I', part.relname);
+    if to_regclass(format('inventory_archive.%I', part.relname)) is not null then
+      -- Same month archived before (e.g. backdated rows): append to it
+      execute format('insert into inventory_archive.%I select * from public.%I', part.relname, part.relname);
+      execute format('drop table public.%I', part.relname);
+    else
+      execute format('alter table public.%I set schema inventory_archive', part.relname);
+    end if;
+    action := 'archived'; partition_name := part.relname; return next;
+  end loop;
+end
+$$;
+
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule('maintain-partitions', '7 3 * * *', 'select * from public.maintain_partitions()');
+  end if;
+end
+$$;
+
+select * from public.maintain_partitions();
+
+-- market_retailer_metrics (0005) with a year bound, so the refresh only
+-- reads the sales partitions inside its window
+create or replace function public.market_retailer_metrics(p_months int default 12, p_user uuid default null)
+returns table (
+  user_id uuid,
+  area text,
+  population_band text,
+  competitor_band text,
+  entries bigint,
+  waste_percentage numeric,
+  price_per_kg numeric,
+  kg_per_day numeric
+)
+language sql stable as $$
+  with s as (
+    select s.user_id, s.timestamp, s.population, s.competitors, s.rice_sold, s.rice_unsold, s.price_per_kg,
+           public.sales_days_covered(s.data_level, s.year, s.month, s.week) as days,
+           -- Guarded so make_date never sees an invalid month, whatever order the quals run in
+           case when s.year not between 1 and 9999 then null
+                when s.data_level = 'yearly' then make_date(s.year + 1, 1, 1)
+                when s.month between 1 and 12 then (make_date(s.year, s.month, 1) + interval '1 month')::date
+           end as period_end
+      from public.sales s
+     where (p_user is null or s.user_id = p_user)
+       and s.year >= extract(year from current_date - make_interval(months => p_months))::int
+  ),
+  r as (
+    select s.user_id,
+           count(*) as entries,
+           sum(coalesce(s.rice_sold, 0)) as sold,
+           sum(coalesce(s.rice_unsold, 0)) as unsold,
+           avg(s.price_per_kg) filter (where s.price_per_kg > 0) as price,
+           sum(s.days) as days,
+           (array_agg(s.population order by s.period_end desc, s.timestamp desc)
+              filter (where s.population is not null))[1] as population,
+           (array_agg(s.competitors order by s.period_end desc, s.timestamp desc)
+              filter (where s.competitors is not null))[1] as competitors
+      from s
+     where s.days is not null
+       and s.period_end > (current_date - make_interval(months => p_months))
+     group by s.user_id
+  )
+  select r.user_id,
+         coalesce(nullif(trim(p.retailer_area), ''), 'Unspecified'),
+         -- Same bands as calculate_market_comparison() in app.py
+         case when r.population is null then null
+              when r.population < 1000 then 'Small Market (<1000)'
+              when r.population < 2000 then 'Medium Market (1000-2000)'
+              else 'Large Market (>2000)'
+         end,
+         case when r.competitors is null then null
+              when r.competitors <= 2 then '0-2 competitors'
+              when r.competitors <= 5 then '3-5 competitors'
+              else '6+ competitors'
+         end,
+         r.entries,
+         case when r.sold + r.unsold > 0 then round(r.unsold / (r.sold + r.unsold) * 100, 4) end,
+         round(r.price, 4),
+         case when r.days > 0 then round(r.sold / r.days, 4) end
+    from r
+    join public.profiles p on p.id = r.user_id
+   where p.role = 'retailer'
+$$;
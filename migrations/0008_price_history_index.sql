@@ -0,0 +1,10 @@
+-- /api/price-history: WHERE rice_variety = $1 AND date_posted BETWEEN $2 AND $3
+-- GROUP BY date_posted, optionally AND retailer_id = $4. The INCLUDE columns
+-- let it run as an index-only scan on the (mostly all-visible) past months.
+-- Postgres cannot build an index CONCURRENTLY on a partitioned table, so
+-- migrate_supabase.py runs this as CREATE INDEX ... ON ONLY the parent, a
+-- CONCURRENTLY build per partition and ALTER INDEX ... ATTACH PARTITION:
+-- inventory writes never wait for a build. Partitions created later get
+-- the index from the parent when they are attached.
+create index concurrently if not exists idx_ri_variety_posted
+  on public.retailer_inventory(rice_variety, date_posted) include (price_per_kg, stock_kg, retailer_id);
@@ -0,0 +1,74 @@
+-- Change feed for /api/inventory/stream. Every statement that writes
+-- retailer_inventory sends one NOTIFY on 'inventory_changes' per
+-- (retailer, variety) it touched, numbered from inventory_event_seq so
+-- clients can resume with Last-Event-ID. The payload stays far below the
+-- 8000-byte NOTIFY limit:
+--   {"seq": 42, "op": "INSERT", "retailer_id": "...", "rice_variety": "Jasmine",
+--    "area": "Pasay City", "date_posted": "2026-10-19", "rows": 3}
+-- Notifications are delivered on commit, and never for rolled-back writes.
+-- Bulk loads that run with session_replication_role = replica (the seed
+-- script) and maintain_partitions(), which writes the partitions directly,
+-- send nothing.
+
+create sequence if not exists public.inventory_event_seq;
+
+create or replace function public.inventory_notify_change(
+  p_op text, p_retailer uuid, p_variety text, p_date date, p_rows bigint
+) returns void
+language plpgsql as $$
+begin
+  perform pg_notify('inventory_changes', json_build_object(
+    'seq', nextval('public.inventory_event_seq'),
+    'op', p_op,
+    'retailer_id', p_retailer,
+    'rice_variety', p_variety,
+    'area', (select retailer_area from public.profiles where id = p_retailer),
+    'date_posted', p_date,
+    'rows', p_rows
+  )::text);
+end
+$$;
+
+create or replace function public.retailer_inventory_notify() returns trigger
+language plpgsql as $$
+declare
+  ev record;
+begin
+  if tg_op = 'INSERT' then
+    for ev in select retailer_id, rice_variety, max(date_posted) as d, count(*) as n
+                from new_rows group by retailer_id, rice_variety loop
+      perform public.inventory_notify_change(tg_op, ev.retailer_id, ev.rice_variety, ev.d, ev.n);
+    end loop;
+  elsif tg_op = 'DELETE' then
+    for ev in select retailer_id, rice_variety, max(date_posted) as d, count(*) as n
+                from old_rows group by retailer_id, rice_variety loop
+      perform public.inventory_notify_change(tg_op, ev.retailer_id, ev.rice_variety, ev.d, ev.n);
+    end loop;
+  else
+    -- A changed variety is an update to both boards
+    for ev in select retailer_id, rice_variety, max(date_posted) as d, count(*) filter (where is_new) as n
+                from (select retailer_id, rice_variety, date_posted, true as is_new from new_rows
+                      union all
+                      select retailer_id, rice_variety, date_posted, false from old_rows) r
+               group by retailer_id, rice_variety loop
+      perform public.inventory_notify_change(tg_op, ev.retailer_id, ev.rice_variety, ev.d, ev.n);
+    end loop;
+  end if;
+  return null;
+end
+$$;
+
+drop trigger if exists retailer_inventory_notify_insert on public.retailer_inventory;
+create trigger retailer_inventory_notify_insert
+  after insert on public.retailer_inventory referencing new table as new_rows
+  for each statement execute function public.retailer_inventory_notify();
+
+drop trigger if exists retailer_inventory_notify_update on public.retailer_inventory;
+create trigger retailer_inventory_notify_update
+  after update on public.retailer_inventory referencing old table as old_rows new table as new_rows
+  for each statement execute function public.retailer_inventory_notify();
+
+drop trigger if exists retailer_inventory_notify_delete on public.retailer_inventory;
+create trigger retailer_inventory_notify_delete
+  after delete on public.retailer_inventory referencing old table as old_rows
+  for each statement execute function public.retailer_inventory_notify();
@@ -0,0 +1,35 @@
+-- Cross-worker invalidation of the read cache in app.py. Write paths call
+-- cache_invalidate(scope, key) inside their transaction, e.g.
+-- ('sales', <user id>) or ('inventory', <retailer id>). It records a new
+-- version for the key in cache_versions and NOTIFYs 'cache_invalidation':
+--   {"scope": "sales", "key": "...", "version": 1234}
+-- Both take effect on commit, so a rolled-back write evicts nothing. Every
+-- worker LISTENs and evicts the matching entries. Versions come from one
+-- sequence, so a worker that lost its listener connection evicts the keys
+-- whose version moved past the last one it saw before serving from its
+-- cache again.
+
+create sequence if not exists public.cache_version_seq;
+
+create table if not exists public.cache_versions (
+  scope text not null,
+  key text not null,
+  version bigint not null,
+  updated_at timestamptz not null default now(),
+  primary key (scope, key)
+);
+
+create index if not exists idx_cache_versions_version on public.cache_versions(version);
+
+create or replace function public.cache_invalidate(p_scope text, p_key text) returns bigint
+language plpgsql as $$
+declare
+  v bigint := nextval('public.cache_version_seq');
+begin
+  insert into public.cache_versions (scope, key, version, updated_at)
+  values (p_scope, p_key, v, now())
+  on conflict (scope, key) do update set version = excluded.version, updated_at = excluded.updated_at;
+  perform pg_notify('cache_invalidation', json_build_object('scope', p_scope, 'key', p_key, 'version', v)::text);
+  return v;
+end
+$$;
@@ -0,0 +1,209 @@
+-- Keep user_data_catalog (0004) up to date incrementally. The triggers used
+-- to rebuild a user's catalog from the whole history on every sales write;
+-- now each statement applies only its own rows: counts and sums per year
+-- and month are added or subtracted, and a latest[k] entry is replaced when
+-- a new row is newer. latest_rows records which row each latest[k] came
+-- from ({"k": {"id", "timestamp"}}). A full rebuild is only needed when a
+-- DELETE or UPDATE removes one of those rows, since only the history can
+-- tell what the next latest row is.
+
+alter table public.user_data_catalog add column if not exists latest_rows jsonb not null default '{}'::jsonb;
+
+-- Keys of user_data_catalog.latest a sales row belongs to
+create or replace function public.sales_catalog_keys(p_year int, p_month int)
+returns setof text
+language sql immutable as $$
+  select 'all'
+  union all select 'y:' || p_year where p_year is not null
+  union all select 'm:' || p_month where p_month is not null
+  union all select 'ym:' || p_year || '-' || p_month where p_year is not null and p_month is not null
+$$;
+
+create or replace function public.refresh_user_data_catalog(p_user uuid) returns void
+language plpgsql as $$
+begin
+  -- Serialize catalog changes per user: the second writer waits and then
+  -- sees the first one's committed rows, so the catalog never misses a write
+  perform pg_advisory_xact_lock(7273, hashtext(p_user::text));
+  -- The profile is gone when this runs from its ON DELETE CASCADE
+  if not exists (select 1 from public.profiles where id = p_user) then
+    delete from public.user_data_catalog where user_id = p_user;
+    return;
+  end if;
+  insert into public.user_data_catalog (user_id, row_count, years, latest, latest_rows, stats, updated_at)
+  with s as (
+    select id, timestamp, year, month,
+           jsonb_build_object(
+             'population', population, 'avg_consumption', avg_consumption,
+             'purchasing_power', purchasing_power, 'competitors', competitors,
+             'customer_demand', customer_demand
+           ) as fields,
+           coalesce(waste_percentage, 0) as waste,
+           coalesce(price_per_kg, 0) as price,
+           coalesce(rice_sold, 0) as sold,
+           public.sales_season_month(year, month, week_date) as season_month
+      from public.sales
+     where user_id = p_user
+  ),
+  latest as (
+    select distinct on (k) k, fields, timestamp, id
+      from s, public.sales_catalog_keys(s.year, s.month) k
+     order by k, timestamp desc, id
+  ),
+  by_month as (
+    select season_month, count(*) as n, sum(sold) as sum_sold, sum(waste) as sum_waste, sum(price) as sum_price
+      from s
+     where season_month is not null
+     group by season_month
+  )
+  select p_user,
+         (select count(*) from s),
+         coalesce((select jsonb_object_agg(year::text, n)
+                     from (select year, count(*) as n from s where coalesce(year, 0) <> 0 group by year) y), '{}'::jsonb),
+         coalesce((select jsonb_object_agg(k, fields) from latest), '{}'::jsonb),
+         coalesce((select jsonb_object_agg(k, jsonb_build_object('id', id, 'timestamp', timestamp)) from latest),
+                  '{}'::jsonb),
+         jsonb_build_object(
+           'count', (select count(*) from s),
+           'sum_waste', (select coalesce(sum(waste), 0) from s),
+           'sum_price', (select coalesce(sum(price), 0) from s),
+           'sum_sold', (select coalesce(sum(sold), 0) from s),
+           'by_month', coalesce((select jsonb_object_agg(season_month::text, jsonb_build_object(
+                          'count', n, 'sum_sold', sum_sold, 'sum_waste', sum_waste, 'sum_price', sum_price))
+                                   from by_month), '{}'::jsonb)
+         ),
+         now()
+  on conflict (user_id) do update
+     set row_count = excluded.row_count, years = excluded.years, latest = excluded.latest,
+         latest_rows = excluded.latest_rows, stats = excluded.stats, updated_at = excluded.updated_at;
+end
+$$;
+
+-- Apply one statement's rows for one user: p_new were inserted (or are the
+-- new versions of updated rows), p_old deleted (or the old versions), both
+-- as JSON arrays of sales rows.
+create or replace function public.apply_user_data_catalog_change(p_user uuid, p_new jsonb, p_old jsonb)
+returns void
+language plpgsql as $$
+declare
+  cat public.user_data_catalog%rowtype;
+begin
+  perform pg_advisory_xact_lock(7273, hashtext(p_user::text));
+  select * into cat from public.user_data_catalog where user_id = p_user;
+  if not found or exists (
+       select 1
+         from jsonb_populate_recordset(null::public.sales, p_old) o,
+              public.sales_catalog_keys(o.year, o.month) k
+        where (cat.latest_rows -> k ->> 'id')::uuid = o.id
+     ) then
+    perform public.refresh_user_data_catalog(p_user);
+    return;
+  end if;
+
+  with changes as (
+    select 1 as sign, r.* from jsonb_populate_recordset(null::public.sales, p_new) r
+    union all
+    select -1, r.* from jsonb_populate_recordset(null::public.sales, p_old) r
+  ),
+  totals as (
+    select coalesce(sum(sign), 0) as n,
+           coalesce(sum(sign * coalesce(waste_percentage, 0)), 0) as waste,
+           coalesce(sum(sign * coalesce(price_per_kg, 0)), 0) as price,
+           coalesce(sum(sign * coalesce(rice_sold, 0)), 0) as sold
+      from changes
+  ),
+  years as (
+    select coalesce(jsonb_object_agg(y, n) filter (where n > 0), '{}'::jsonb) as v
+      from (select y, sum(n) as n
+              from (select key as y, value::bigint as n from jsonb_each_text(cat.years)
+                    union all
+                    select year::text, sign from changes where coalesce(year, 0) <> 0) u
+             group by y) t
+  ),
+  months as (
+    select coalesce(jsonb_object_agg(m, jsonb_build_object(
+             'count', n, 'sum_sold', sum_sold, 'sum_waste', sum_waste, 'sum_price', sum_price
+           )) filter (where n > 0), '{}'::jsonb) as v
+      from (select m, sum(n) as n, sum(sold) as sum_sold, sum(waste) as sum_waste, sum(price) as sum_price
+              from (select key as m, (value ->> 'count')::bigint as n, (value ->> 'sum_sold')::numeric as sold,
+                           (value ->> 'sum_waste')::numeric as waste, (value ->> 'sum_price')::numeric as price
+                      from jsonb_each(coalesce(cat.stats -> 'by_month', '{}'::jsonb))
+                    union all
+                    select public.sales_season_month(year, month, week_date)::text, sign,
+                           sign * coalesce(rice_sold, 0), sign * coalesce(waste_percentage, 0),
+                           sign * coalesce(price_per_kg, 0)
+                      from changes
+                     where public.sales_season_month(year, month, week_date) is not null) u
+             group by m) t
+  ),
+  newest as (
+    select distinct on (k) k, timestamp, id,
+           jsonb_build_object(
+             'population', population, 'avg_consumption', avg_consumption,
+             'purchasing_power', purchasing_power, 'competitors', competitors,
+             'customer_demand', customer_demand
+           ) as fields
+      from changes, public.sales_catalog_keys(changes.year, changes.month) k
+     where sign = 1
+     order by k, timestamp desc, id
+  ),
+  -- Same order as the rebuild: newest timestamp first, then lowest id
+  replaced as (
+    select coalesce(jsonb_object_agg(k, fields), '{}'::jsonb) as latest,
+           coalesce(jsonb_object_agg(k, jsonb_build_object('id', id, 'timestamp', timestamp)), '{}'::jsonb) as latest_rows
+      from newest n
+     where not cat.latest_rows ? n.k
+        or n.timestamp > (cat.latest_rows -> n.k ->> 'timestamp')::timestamptz
+        or (n.timestamp = (cat.latest_rows -> n.k ->> 'timestamp')::timestamptz
+            and n.id < (cat.latest_rows -> n.k ->> 'id')::uuid)
+  )
+  update public.user_data_catalog c
+     set row_count = c.row_count + totals.n,
+         years = years.v,
+         latest = c.latest || replaced.latest,
+         latest_rows = c.latest_rows || replaced.latest_rows,
+         stats = jsonb_build_object(
+           'count', coalesce((c.stats ->> 'count')::bigint, 0) + totals.n,
+           'sum_waste', coalesce((c.stats ->> 'sum_waste')::numeric, 0) + totals.waste,
+           'sum_price', coalesce((c.stats ->> 'sum_price')::numeric, 0) + totals.price,
+           'sum_sold', coalesce((c.stats ->> 'sum_sold')::numeric, 0) + totals.sold,
+           'by_month', months.v
+         ),
+         updated_at = now()
+    from totals, years, months, replaced
+   where c.user_id = p_user;
+end
+$$;
+
+-- The sales_catalog_* triggers (0004, recreated on the partitioned table
+-- by 0007) call this; one apply per user per statement
+create or replace function public.sales_refresh_user_data_catalog() returns trigger
+language plpgsql as $$
+declare
+  new_json jsonb := '[]'::jsonb;
+  old_json jsonb := '[]'::jsonb;
+  r record;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    select coalesce(jsonb_agg(to_jsonb(n)), '[]'::jsonb) into new_json from new_rows n;
+  end if;
+  if tg_op in ('DELETE', 'UPDATE') then
+    select coalesce(jsonb_agg(to_jsonb(o)), '[]'::jsonb) into old_json from old_rows o;
+  end if;
+  for r in
+    select user_id,
+           coalesce(jsonb_agg(sale) filter (where is_new), '[]'::jsonb) as new_rows,
+           coalesce(jsonb_agg(sale) filter (where not is_new), '[]'::jsonb) as old_rows
+      from (select (e ->> 'user_id')::uuid as user_id, e as sale, true as is_new from jsonb_array_elements(new_json) e
+            union all
+            select (e ->> 'user_id')::uuid, e, false from jsonb_array_elements(old_json) e) x
+     group by user_id
+  loop
+    perform public.apply_user_data_catalog_change(r.user_id, r.new_rows, r.old_rows);
+  end loop;
+  return null;
+end
+$$;
+
+-- Backfill latest_rows
+select public.refresh_user_data_catalog(user_id) from public.user_data_catalog;
@@ -0,0 +1,53 @@
+-- Since 0007 partitions sales, a duplicate yearly/monthly entry is caught by
+-- the leaf partition's copy of uq_sales_yearly / uq_sales_monthly, and the
+-- error names that index (e.g. sales_y2025_user_id_year_idx) rather than
+-- the parent app.py maps to a message. The period-hierarchy trigger now
+-- checks for the duplicate itself, under the same per-(user, year) advisory
+-- lock, and raises unique_violation with the parent index name. The unique
+-- indexes stay as the backstop.
+
+create or replace function public.sales_check_period_hierarchy() returns trigger
+language plpgsql as $$
+begin
+  if new.year is null then
+    return new;
+  end if;
+  -- Every level takes the lock (a yearly insert must not race a monthly one);
+  -- key space 7272 keeps these apart from the migration runner's lock
+  perform pg_advisory_xact_lock(7272, hashtext(new.user_id::text || ':' || new.year));
+  if new.data_level = 'yearly' then
+    if exists (
+      select 1 from public.sales
+       where user_id = new.user_id and year = new.year and data_level = 'yearly' and id <> new.id
+    ) then
+      raise exception 'Year % already has a yearly entry', new.year
+        using errcode = 'unique_violation', constraint = 'uq_sales_yearly';
+    end if;
+    return new;
+  end if;
+  if exists (
+    select 1 from public.sales
+     where user_id = new.user_id and year = new.year and data_level = 'yearly' and id <> new.id
+  ) then
+    raise exception 'Year % already has a yearly entry', new.year
+      using errcode = 'check_violation', constraint = 'sales_period_under_yearly';
+  end if;
+  if new.data_level = 'monthly' and exists (
+    select 1 from public.sales
+     where user_id = new.user_id and year = new.year and month = new.month
+       and data_level = 'monthly' and id <> new.id
+  ) then
+    raise exception '%-% already has a monthly entry', new.year, lpad(new.month::text, 2, '0')
+      using errcode = 'unique_violation', constraint = 'uq_sales_monthly';
+  end if;
+  if new.data_level in ('weekly', 'daily') and exists (
+    select 1 from public.sales
+     where user_id = new.user_id and year = new.year and month = new.month
+       and data_level = 'monthly' and id <> new.id
+  ) then
+    raise exception '%-% already has a monthly entry', new.year, lpad(new.month::text, 2, '0')
+      using errcode = 'check_violation', constraint = 'sales_period_under_monthly';
+  end if;
+  return new;
+end
+$$;
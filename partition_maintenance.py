@@ -0,0 +1,99 @@
+"""Partition maintenance for sales (yearly) and retailer_inventory (monthly).
+
+Runs public.maintain_partitions() from migration 0007: creates the upcoming
+partitions (partition_policy.premake), moves rows that landed in a default
+partition into their own partition, and detaches retailer_inventory months
+older than partition_policy.retention_months into the inventory_archive
+schema. Where pg_cron is available the migration schedules this daily; run
+it from a deploy hook or an external cron elsewhere.
+
+    python partition_maintenance.py                          # run maintenance
+    python partition_maintenance.py --status                 # partitions, rows, archive
+    python partition_maintenance.py --retention-months 36    # change the policy, then run
+    python partition_maintenance.py --retention-months off   # keep every month attached
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+import psycopg
+
+from migrate_supabase import normalize_db_url
+
+ROOT = Path(__file__).parent
+PARENTS = ('sales', 'retailer_inventory')
+
+
+def print_status(conn):
+    for parent, premake, retention in conn.execute(
+        "select parent, premake, retention_months from public.partition_policy order by parent"
+    ).fetchall():
+        kept = f"{retention} months" if retention is not None else 'forever'
+        print(f"{parent}: premake {premake}, retention {kept}")
+        rows = conn.execute(
+            "select c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, "
+            "pg_total_relation_size(c.oid) "
+            "from pg_inherits i join pg_class c on c.oid = i.inhrelid "
+            "where i.inhparent = %s::regclass order by c.relname",
+            (f"public.{parent}",)
+        ).fetchall()
+        for name, bound, tuples, size in rows:
+            estimate = f"~{max(tuples, 0):,} rows" if tuples >= 0 else 'not analyzed'
+            print(f"  {name:32} {estimate:>16} {size / 1024 / 1024:8.1f} MB  {bound}")
+    archived = conn.execute(
+        "select c.relname, c.reltuples::bigint from pg_class c join pg_namespace n on n.oid = c.relnamespace "
+        "where n.nspname = 'inventory_archive' and c.relkind = 'r' order by c.relname"
+    ).fetchall()
+    print(f"inventory_archive: {len(archived)} table(s)")
+    for name, tuples in archived:
+        print(f"  {name:32} ~{max(tuples, 0):,} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create upcoming partitions and archive old inventory months')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('--status', action='store_true', help='List partitions and archived tables, change nothing')
+    parser.add_argument('--table', choices=PARENTS, default='retailer_inventory',
+                        help='Table whose policy --premake/--retention-months change (default: %(default)s)')
+    parser.add_argument('--premake', type=int, help='Partitions to create ahead of the current year/month')
+    parser.add_argument('--retention-months',
+                        help="Months kept attached before archiving, or 'off' (retailer_inventory only)")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / '.env')
+    db_url = normalize_db_url(args.db_url or os.getenv('SUPABASE_DB_URL') or '')
+    if not db_url:
+        print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+        sys.exit(1)
+
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        if conn.execute("select to_regclass('public.partition_policy')").fetchone()[0] is None:
+            print('ERROR: partition_policy not found; run migrate_supabase.py first (migration 0007)')
+            sys.exit(1)
+        if args.status:
+            print_status(conn)
+            return
+
+        if args.premake is not None:
+            conn.execute("update public.partition_policy set premake = %s, updated_at = now() where parent = %s",
+                         (max(args.premake, 0), args.table))
+            print(f"{args.table}: premake {max(args.premake, 0)}")
+        if args.retention_months is not None:
+            if args.table != 'retailer_inventory':
+                print('ERROR: retention only applies to retailer_inventory')
+                sys.exit(1)
+            months = None if args.retention_months.lower() in ('off', 'none') else int(args.retention_months)
+            conn.execute("update public.partition_policy set retention_months = %s, updated_at = now() "
+                         "where parent = 'retailer_inventory'", (months,))
+            print(f"retailer_inventory: retention {f'{months} months' if months is not None else 'off'}")
+
+        changes = conn.execute("select action, partition_name from public.maintain_partitions()").fetchall()
+        for action, name in changes:
+            print(f"[INFO] {action} {name}")
+        print(f"Done: {len(changes)} change(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""Seed a Postgres database with synthetic retailers, consumers, sales and inventory.
+
+The 70 real retailers in pasay_rice_retailers_70.xlsx are used as templates:
+each synthetic retailer copies a template's area, address and daily/weekly/
+monthly volumes (with per-retailer scaling), then gets years of mixed
+granularity `sales` rows and daily `retailer_inventory` price boards with
+seasonality and price drift. Everything is bulk-loaded with COPY.
+
+The output is fully determined by --seed and --as-of (ids included), so two runs
+with the same arguments produce identical data.
+
+    python seed_synthetic.py --db-url postgresql://postgres@localhost:5432/anilytics \\
+        --retailers 10000 --consumers 50000 --years 3 --inventory-days 1000 --jobs 8 --replace --skip-triggers
+
+Seeded accounts log in as retailer00000@seed.anilytics.local /
+consumer00000@seed.anilytics.local with --password (default: password123).
+"""
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import zipfile
+import argparse
+import calendar
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+from pathlib import Path
+
+from dotenv import load_dotenv
+import psycopg
+from werkzeug.security import generate_password_hash
+
+ROOT = Path(__file__).parent
+SEED_EMAIL_DOMAIN = 'seed.anilytics.local'
+XLSX_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+# Variety -> (base price per kg in PHP, share of retailers carrying it)
+RICE_VARIETIES = {
+    'Regular Milled': (42.0, 0.9),
+    'Well Milled': (46.0, 0.9),
+    'Sinandomeng': (50.0, 0.8),
+    'Dinorado': (58.0, 0.6),
+    'Jasmine': (60.0, 0.6),
+    'Premium': (54.0, 0.5),
+    'Special': (56.0, 0.4),
+    'Malagkit': (62.0, 0.35),
+    'Brown Rice': (68.0, 0.25),
+    'Red Rice': (72.0, 0.15),
+    'Black Rice': (95.0, 0.1),
+    'NFA Rice': (38.0, 0.3),
+}
+# Demand multiplier by month: holidays and school opening up, lean months down
+MONTH_SEASONALITY = [1.00, 0.90, 0.92, 0.95, 1.00, 1.08, 1.05, 0.98, 0.97, 1.00, 1.06, 1.20]
+
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Pedro', 'Rosa', 'Carlo', 'Liza', 'Mark', 'Joy', 'Paolo', 'Grace']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Villanueva', 'Ramos']
+
+
+def read_retailer_workbook(path: Path):
+    """Read the first sheet of the workbook with the standard library only."""
+    with zipfile.ZipFile(path) as zf:
+        shared = []
+        if 'xl/sharedStrings.xml' in zf.namelist():
+            root = ET.fromstring(zf.read('xl/sharedStrings.xml'))
+            for si in root.findall('m:si', XLSX_NS):
+                shared.append(''.join(t.text or '' for t in si.iter(f"{{{XLSX_NS['m']}}}t")))
+        sheet = ET.fromstring(zf.read('xl/worksheets/sheet1.xml'))
+    rows = []
+    for row in sheet.iter(f"{{{XLSX_NS['m']}}}row"):
+        values = {}
+        for cell in row.findall('m:c', XLSX_NS):
+            col = re.sub(r'\d+', '', cell.get('r', ''))
+            v = cell.find('m:v', XLSX_NS)
+            if v is None:
+                continue
+            values[col] = shared[int(v.text)] if cell.get('t') == 's' else v.text
+        rows.append(values)
+    header, body = rows[0], rows[1:]
+    retailers = []
+    for r in body:
+        if not r.get('A'):
+            continue
+        retailers.append({
+            'name': r.get('A', '').strip(),
+            'area': r.get('B', '').strip(),
+            'location': r.get('C', '').strip(),
+            'daily_kg': float(r.get('D') or 0),
+            'weekly_kg': float(r.get('E') or 0),
+            'monthly_kg': float(r.get('F') or 0),
+        })
+    return retailers
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def copy_text(value) -> str:
+    """Format one value for COPY ... (FORMAT text)."""
+    if value is None:
+        return '\\N'
+    s = str(value)
+    if '\\' in s or '\t' in s or '\n' in s or '\r' in s:
+        s = s.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return s
+
+
+def build_retailers(templates, count: int, seed: int):
+    retailers = []
+    for i in range(count):
+        rng = random.Random(f"{seed}:retailer:{i}")
+        t = templates[i % len(templates)]
+        scale = rng.lognormvariate(0.0, 0.35)
+        varieties = [v for v, (_p, share) in RICE_VARIETIES.items() if rng.random() < share]
+        if len(varieties) < 2:
+            varieties = ['Regular Milled', 'Well Milled']
+        retailers.append({
+            'index': i,
+            'id': seeded_uuid(rng),
+            'email': f"retailer{i:05d}@{SEED_EMAIL_DOMAIN}",
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'company': re.sub(r'#\d+$', f"#{i}", t['name']) if '#' in t['name'] else f"{t['name']} #{i}",
+            'area': t['area'],
+            'location': t['location'],
+            'daily_kg': max(20.0, t['daily_kg'] * scale),
+            'price_factor': rng.uniform(0.94, 1.08),
+            'varieties': varieties,
+            'population': rng.randrange(400, 3600),
+            'avg_consumption': round(rng.uniform(0.12, 0.35), 3),
+            'purchasing_power': round(rng.uniform(0.35, 0.95), 3),
+            'competitors': rng.randrange(0, 7),
+        })
+    return retailers
+
+
+def profile_lines(retailers, consumers: int, seed: int, password_hash: str):
+    created = '2022-01-01 08:00:00+00'
+    for r in retailers:
+        yield '\t'.join(copy_text(v) for v in (
+            r['id'], created, created, r['first_name'], r['last_name'], r['email'], password_hash,
+            'retailer', r['company'], r['area'], r['location'],
+        )) + '\n'
+    for i in range(consumers):
+        rng = random.Random(f"{seed}:consumer:{i}")
+        yield '\t'.join(copy_text(v) for v in (
+            seeded_uuid(rng), created, created, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+            f"consumer{i:05d}@{SEED_EMAIL_DOMAIN}", password_hash, 'consumer', None, None, None,
+        )) + '\n'
+
+
+def sales_lines(r, years, seed: int, today: date):
+    """Sales history for one retailer, respecting the app's period hierarchy.
+
+    Per year: ~8% yearly-only; otherwise each month is monthly, weekly or daily.
+    """
+    rng = random.Random(f"{seed}:sales:{r['index']}")
+    pop, cons, power, comp = r['population'], r['avg_consumption'], r['purchasing_power'], r['competitors']
+    predicted = round(pop * cons * power / (1 + comp), 2)
+
+    def row(level, year, month, week, day, week_date, days_covered, when):
+        season = MONTH_SEASONALITY[(month or 6) - 1]
+        sold = max(0.0, rng.gauss(r['daily_kg'], r['daily_kg'] * 0.15) * season * days_covered)
+        unsold = max(0.0, sold * rng.betavariate(2, 18) * 1.1)
+        price = round(RICE_VARIETIES['Well Milled'][0] * r['price_factor'] * (1 + 0.02 * (year - 2022))
+                      + rng.uniform(-1.5, 1.5), 2)
+        total = sold + unsold
+        waste = round(unsold / total * 100, 2) if total else 0
+        demand = 'High' if season >= 1.05 else 'Low' if season <= 0.92 else 'Medium'
+        return '\t'.join(copy_text(v) for v in (
+            seeded_uuid(rng), r['id'], when.strftime('%Y-%m-%d %H:%M:%S+08'), week_date, level,
+            year, month, week, day, round(sold, 2), round(unsold, 2), price, pop, cons, power, comp,
+            demand, predicted, waste, round(sold * price, 2),
+        )) + '\n'
+
+    for year in years:
+        if rng.random() < 0.08 and year < today.year:
+            yield row('yearly', year, None, None, None, f"{year}", 365, datetime(year, 12, 31, 20))
+            continue
+        for month in range(1, 13):
+            if date(year, month, 1) > today:
+                break
+            last_day = calendar.monthrange(year, month)[1]
+            n_weeks = 5 if last_day >= 29 else 4
+            mode = rng.choices(('monthly', 'weekly', 'daily'), (0.3, 0.4, 0.3))[0]
+            if mode == 'monthly':
+                yield row('monthly', year, month, None, None, f"{year}-{month:02d}", last_day,
+                          datetime(year, month, last_day, 20))
+            elif mode == 'weekly':
+                for week in range(1, n_weeks + 1):
+                    end_day = min(week * 7, last_day)
+                    days = end_day - (week - 1) * 7
+                    yield row('weekly', year, month, week, None, f"{year}-{month:02d}-W{week:02d}", days,
+                              datetime(year, month, end_day, 20))
+            else:
+                for day in range(1, last_day + 1):
+                    if date(year, month, day) > today:
+                        break
+                    if rng.random() < 0.15:
+                        continue  # missed days
+                    yield row('daily', year, month, (day - 1) // 7 + 1, day, f"{year}-{month:02d}-{day:02d}", 1,
+                              datetime(year, month, day, 20))
+
+
+def inventory_lines(r, start: date, days: int, seed: int):
+    """Daily price boards: each carried variety posted most days with drift and seasonality."""
+    rng = random.Random(f"{seed}:inventory:{r['index']}")
+    prefix = (seed & 0xffffffff) << 96 | r['index'] << 48
+    rid = r['id']
+    factor = r['price_factor']
+    carried = [(vi, v, RICE_VARIETIES[v][0]) for vi, v in enumerate(r['varieties'])]
+    drift = {vi: 0.0 for vi, _v, _p in carried}
+    daily_kg = r['daily_kg']
+    for offset in range(days):
+        d = start + timedelta(days=offset)
+        ds = d.isoformat()
+        season = MONTH_SEASONALITY[d.month - 1]
+        inflation = 1 + 0.03 * (offset / 365.0)
+        for vi, variety, base in carried:
+            if rng.random() < 0.1:
+                continue  # not posted today
+            drift[vi] = max(-0.08, min(0.08, drift[vi] + rng.gauss(0, 0.004)))
+            price = round(base * factor * inflation * (1 + drift[vi]) * (0.98 + 0.04 * season) * 2) / 2
+            stock = round(daily_kg * rng.uniform(0.5, 3.0) / len(carried), 1)
+            h = '%032x' % (prefix | offset << 8 | vi)
+            yield (f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}\t{rid}\t{ds}\t{variety}\t{stock}\t{price}\t"
+                   f"{ds} 07:{vi:02d}:00+08\n")
+
+
+def _copy_lines(cur, sql, lines, batch_size=20000):
+    count = 0
+    buf = []
+    with cur.copy(sql) as cp:
+        for line in lines:
+            buf.append(line)
+            if len(buf) >= batch_size:
+                cp.write(''.join(buf))
+                count += len(buf)
+                buf = []
+        if buf:
+            cp.write(''.join(buf))
+            count += len(buf)
+    return count
+
+
+def seed_chunk(task):
+    """Worker: COPY sales and inventory for a slice of retailers in one transaction."""
+    db_url, retailers, years, as_of, inv_days, seed, skip_triggers = task
+    inv_start = as_of - timedelta(days=inv_days - 1)
+    with psycopg.connect(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET synchronous_commit = off")
+            if skip_triggers:
+                # Rows reference profiles loaded in the same run, so FK checks are redundant
+                cur.execute("SET session_replication_role = replica")
+            n_sales = _copy_lines(
+                cur,
+                "COPY sales (id, user_id, timestamp, week_date, data_level, year, month, week, day, "
+                "rice_sold, rice_unsold, price_per_kg, population, avg_consumption, purchasing_power, "
+                "competitors, customer_demand, predicted_demand, waste_percentage, total_revenue) FROM STDIN",
+                (line for r in retailers for line in sales_lines(r, years, seed, as_of))
+            )
+            n_inv = _copy_lines(
+                cur,
+                "COPY retailer_inventory (id, retailer_id, date_posted, rice_variety, stock_kg, price_per_kg, "
+                "created_at) FROM STDIN",
+                (line for r in retailers for line in inventory_lines(r, inv_start, inv_days, seed))
+            )
+            if skip_triggers:
+                # The replica role also skipped the catalog (0004) and waste-anomaly (0006) triggers
+                cur.execute("SET session_replication_role = origin")
+                ids = [r['id'] for r in retailers]
+                for fn in ('rebuild_sales_waste_state', 'refresh_user_data_catalog'):
+                    cur.execute("SELECT to_regprocedure(%s) IS NOT NULL", (f"public.{fn}(uuid)",))
+                    if cur.fetchone()[0]:
+                        cur.execute(f"SELECT {fn}(id) FROM unnest(%s::uuid[]) AS id", (ids,))
+        conn.commit()
+    return n_sales, n_inv
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic Anilytics data from the Pasay retailer workbook')
+    parser.add_argument('--db-url', dest='db_url', help='Postgres connection URL (overrides SUPABASE_DB_URL)')
+    parser.add_argument('--xlsx', default=str(ROOT / 'pasay_rice_retailers_70.xlsx'))
+    parser.add_argument('--retailers', type=int, default=70)
+    parser.add_argument('--consumers', type=int, default=200)
+    parser.add_argument('--years', type=int, default=3, help='Years of sales history ending in the --as-of year')
+    parser.add_argument('--inventory-days', type=int, default=365, help='Days of price boards ending on --as-of')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--as-of', dest='as_of', type=date.fromisoformat, default=date.today(),
+                        help='Last day of generated history, YYYY-MM-DD (default: today)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 2, help='Parallel COPY workers')
+    parser.add_argument('--chunk', type=int, default=50, help='Retailers per COPY transaction')
+    parser.add_argument('--skip-triggers', dest='skip_triggers', action='store_true',
+                        help='Skip FK/trigger checks while loading (superuser only, ~40%% faster)')
+    parser.add_argument('--password', default='password123', help='Password for every seeded account')
+    parser.add_argument('--replace', action='store_true',
+                        help='Delete previously seeded accounts (and their rows, via cascade) first')
+    parser.add_argument('--truncate', action='store_true',
+                        help='TRUNCATE profiles, sales and retailer_inventory first (local databases only!)')
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / '.env')
+    db_url = (args.db_url or os.getenv('SUPABASE_DB_URL') or '').strip().strip('"').strip("'")
+    if not db_url:
+        print('ERROR: pass --db-url or set SUPABASE_DB_URL')
+        sys.exit(1)
+
+    templates = read_retailer_workbook(Path(args.xlsx))
+    print(f"Read {len(templates)} template retailers from {args.xlsx}")
+    retailers = build_retailers(templates, args.retailers, args.seed)
+    years = list(range(args.as_of.year - args.years + 1, args.as_of.year + 1))
+    password_hash = generate_password_hash(args.password)
+
+    started = time.perf_counter()
+    with psycopg.connect(db_url) as conn:
+        with conn.cursor() as cur:
+            if args.truncate:
+                cur.execute("TRUNCATE retailer_inventory, sales, profiles CASCADE")
+                print('Truncated profiles, sales, retailer_inventory')
+            elif args.replace:
+                cur.execute("DELETE FROM profiles WHERE email LIKE %s", (f"%@{SEED_EMAIL_DOMAIN}",))
+                print(f"Removed {cur.rowcount} previously seeded profiles")
+            n_profiles = _copy_lines(
+                cur,
+                "COPY profiles (id, created_at, updated_at, first_name, last_name, email, password_hash, role, "
+                "retailer_company, retailer_area, retailer_location) FROM STDIN",
+                profile_lines(retailers, args.consumers, args.seed, password_hash)
+            )
+            # Partitioned tables (migration 0007): create the partitions up front so
+            # the COPYs do not pile up in the default partitions
+            cur.execute("SELECT to_regprocedure('public.ensure_sales_partitions(integer, integer)') IS NOT NULL")
+            if cur.fetchone()[0]:
+                cur.execute("SELECT ensure_sales_partitions(%s, %s)", (years[0], years[-1]))
+                cur.execute("SELECT ensure_inventory_partitions(%s, %s)",
+                            (args.as_of - timedelta(days=args.inventory_days - 1), args.as_of))
+        conn.commit()
+    print(f"Loaded {n_profiles} profiles ({args.retailers} retailers, {args.consumers} consumers)")
+
+    chunks = [retailers[i:i + args.chunk] for i in range(0, len(retailers), args.chunk)]
+    tasks = [(db_url, c, years, args.as_of, args.inventory_days, args.seed, args.skip_triggers)
+             for c in chunks]
+    total_sales = total_inv = 0
+    with Pool(processes=max(1, args.jobs)) as pool:
+        for done, (n_sales, n_inv) in enumerate(pool.imap_unordered(seed_chunk, tasks), start=1):
+            total_sales += n_sales
+            total_inv += n_inv
+            elapsed = time.perf_counter() - started
+            print(f"[{done}/{len(tasks)}] sales={total_sales:,} inventory={total_inv:,} "
+                  f"({(total_sales + total_inv) / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        conn.execute("ANALYZE profiles")
+        conn.execute("ANALYZE sales")
+        conn.execute("ANALYZE retailer_inventory")
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.1f}s: {n_profiles:,} profiles, {total_sales:,} sales rows, "
+          f"{total_inv:,} inventory rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -289,6 +289,10 @@ async function loadConsumerInventory() {
     if (area && area.value) url.searchParams.set('area', area.value)
     if (minP && minP.value) url.searchParams.set('min_price', minP.value)
     if (minP && maxP && maxP.value) url.searchParams.set('max_price', maxP.value)
+    const streamFilters = {}
+    if (variety && variety.value) streamFilters.variety = variety.value
+    if (area && area.value) streamFilters.area = area.value
+    watchInventoryStream(streamFilters, loadConsumerInventory)
     const data = await safeFetchJson(url.toString())
     if (Array.isArray(data)) {
       renderConsumerInventoryTable(data)
@@ -300,6 +304,42 @@ async function loadConsumerInventory() {
   }
 }
 
+// Live updates from /api/inventory/stream: any change matching the filters
+// (or a reset after missed events) refetches the list, debounced so a bulk
+// upload of many varieties reloads once. Reopened only when filters change.
+let inventoryStream = null
+let inventoryStreamKey = null
+let inventoryStreamTimer = null
+let inventoryStreamRetry = null
+
+function watchInventoryStream(filters, reload) {
+  if (!window.EventSource) return
+  const url = new URL('/api/inventory/stream', window.location.origin)
+  Object.keys(filters).forEach((k) => url.searchParams.set(k, filters[k]))
+  const key = url.toString()
+  if (inventoryStream && inventoryStreamKey === key) return
+  if (inventoryStream) inventoryStream.close()
+  clearTimeout(inventoryStreamRetry)
+  inventoryStreamKey = key
+  const source = new EventSource(key)
+  const schedule = () => {
+    clearTimeout(inventoryStreamTimer)
+    inventoryStreamTimer = setTimeout(reload, 500)
+  }
+  source.addEventListener('inventory', schedule)
+  source.addEventListener('reset', schedule)
+  source.onerror = () => {
+    // The browser reconnects on its own unless the server refused the
+    // stream (e.g. 503 when the worker is at its client limit)
+    if (source.readyState !== EventSource.CLOSED) return
+    if (inventoryStream === source) inventoryStream = null
+    inventoryStreamRetry = setTimeout(() => {
+      if (!inventoryStream && inventoryStreamKey === key) watchInventoryStream(filters, reload)
+    }, 30000)
+  }
+  inventoryStream = source
+}
+
 function renderConsumerInventoryTable(items) {
   const body = document.getElementById('inventoryResultsBody')
   if (!body) return
@@ -353,6 +393,7 @@ function initCompanyPage() {
     if (!retailerId) return
     loadCompanyProfile(retailerId)
     loadCompanyInventory(retailerId)
+    watchInventoryStream({ retailer_id: retailerId }, () => loadCompanyInventory(retailerId))
   } catch (e) {
     console.error('Company page init failed:', e)
   }